@@ -1,106 +1,1642 @@
 # api_bgg.py (เฉพาะส่วนที่เกี่ยวกับหมวด ปรับจากเดิม)
+import asyncio
+import base64
+import bisect
+import csv
+import io
+import functools
+import gzip
+import hashlib
+import inspect
+import json
+import os
+import random
 import sqlite3
-from fastapi import FastAPI, Query, HTTPException
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+
+import numpy as np
+from fastapi import Body, FastAPI, Query, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.routing import Match
+
+try:
+    import orjson   # ไม่บังคับ: ถ้าติดตั้งไว้จะใช้ serialize JSON แทน json มาตรฐาน
+except ImportError:
+    orjson = None
+
+try:
+    import brotli   # ไม่บังคับ: ถ้าติดตั้งไว้จะรองรับ Content-Encoding: br
+except ImportError:
+    brotli = None
 
-app = FastAPI(title="BGG API")
 DB_BASE    = "bgg_new.db"
 DB_DETAILS = "bgg_details.db"
+# ฐานข้อมูลรวมจาก import_unified.py: ถ้ามีไฟล์นี้จะอ่านจากไฟล์เดียว (games.id = BGG id, join ด้วย integer)
+DB_UNIFIED = os.environ.get("BGG_DB", "bgg.db")
+UNIFIED    = Path(DB_UNIFIED).exists()
+DB_FILES   = (DB_UNIFIED,) if UNIFIED else (DB_DETAILS, DB_BASE)
+
+# pragma ต่อ connection (ค่าเป็นต่อ 1 ไฟล์ฐานข้อมูล)
+SQLITE_CACHE_KIB  = 32 * 1024           # cache_size = -KiB
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024   # mmap_size
+
+# response cache
+CACHE_MAX_BYTES   = 64 * 1024 * 1024
+CACHE_TTL_SECONDS = 600
+
+# บีบอัด response: body เล็กกว่านี้ส่งดิบ (ไม่คุ้ม header/CPU)
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_THREAD_BYTES = 16 * 1024   # body ใหญ่กว่านี้บีบใน thread แทน event loop
+GZIP_LEVEL         = 6
+BROTLI_QUALITY     = 5
+
+# Cache-Control: max-age สำหรับ CDN/เบราว์เซอร์ (ตั้งผ่าน env ได้)
+HTTP_MAX_AGE = int(os.environ.get("BGG_HTTP_MAX_AGE", "300"))
+
+BATCH_MAX_IDS = 200
+
+# executor ของงาน SQLite (แยกจาก threadpool ของ Starlette)
+DB_WORKERS         = 8
+DB_MAX_QUEUE       = 64     # คำขอที่รอคิวได้สูงสุด เกินนี้ตอบ 503
+DB_QUERY_TIMEOUT   = 5.0    # วินาทีต่อการเรียกฐานข้อมูล 1 ครั้ง เกินนี้ตอบ 504
+
+EXPORT_BATCH_ROWS = 500
+
+# /metrics (Prometheus): ปิดไว้เป็นค่าเริ่มต้น เปิดด้วย BGG_METRICS=1
+METRICS_ENABLED = os.environ.get("BGG_METRICS", "0") == "1"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# snapshot mode: โหลดฐานข้อมูลทั้งก้อนเข้า memory ตอน startup แล้วสลับเมื่อไฟล์ถูก import ใหม่
+SNAPSHOT_ENABLED      = os.environ.get("BGG_SNAPSHOT", "0") == "1"
+SNAPSHOT_POLL_SECONDS = float(os.environ.get("BGG_SNAPSHOT_POLL", "2"))
+
+# ---------------- metrics ----------------
+class Histogram:
+    """histogram สะสม (ต่อชุด label) ตามรูปแบบ Prometheus"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # ช่องสุดท้าย = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+class Metrics:
+    def __init__(self):
+        # RLock: TimedCursor.__del__ อาจถูกเรียกระหว่าง GC ใน thread ที่ถือ lock อยู่แล้ว
+        self._lock = threading.RLock()
+        self.requests: dict[tuple, int] = {}            # (method, route, status) -> count
+        self.latency: dict[str, Histogram] = {}         # route -> histogram
+        self.in_flight = 0
+        self.sql_time: dict[str, Histogram] = {}        # statement -> histogram
+        self.sql_rows: dict[str, int] = {}              # statement -> rows returned
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        with self._lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault(route, Histogram()).observe(seconds)
+
+    def observe_sql(self, statement: str, seconds: float, rows: int):
+        with self._lock:
+            self.sql_time.setdefault(statement, Histogram()).observe(seconds)
+            self.sql_rows[statement] = self.sql_rows.get(statement, 0) + rows
+
+metrics = Metrics()
+
+@functools.lru_cache(maxsize=1024)
+def statement_label(sql: str) -> str:
+    # ยุบช่องว่างให้ SQL เดียวกันได้ label เดียวกัน: hash ของ SQL เต็มแยก statement ที่ขึ้นต้นเหมือนกัน
+    # (เช่น detail ตาม PK กับ export ทั้งแคตตาล็อก, list_games แบบ page กับ cursor) + ต้น SQL ไว้อ่าน
+    text = " ".join(sql.split())
+    return hashlib.sha1(text.encode()).hexdigest()[:10] + " " + text[:120]
+
+class TimedCursor(sqlite3.Cursor):
+    """cursor ที่รวมเวลา execute + fetch และจำนวนแถวที่คืน เป็น 1 sample ต่อการรัน statement 1 ครั้ง
+
+    sample ถูกบันทึกเมื่ออ่านผลหมด, execute statement ถัดไป, ปิด cursor หรือ cursor ถูกเก็บทิ้ง
+    (รวมกรณีวน ``for row in cur`` ตรง ๆ ที่ไม่ผ่าน fetch*)
+    """
+
+    _pending = None   # [statement, วินาที, แถว] ของ statement ที่ยังอ่านผลไม่หมด
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            metrics.observe_sql(*pending)
+
+    def _add(self, t0: float, rows: int):
+        if self._pending is not None:
+            self._pending[1] += time.perf_counter() - t0
+            self._pending[2] += rows
+
+    def execute(self, sql, params=()):
+        self._flush()
+        self._pending = [statement_label(sql), 0.0, 0]
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._add(t0, 0)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._add(t0, row is not None)
+        if row is None:
+            self._flush()
+        return row
+
+    def fetchmany(self, size=None):
+        size = size if size is not None else self.arraysize
+        t0 = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._add(t0, len(rows))
+        if len(rows) < size:
+            self._flush()
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._add(t0, len(rows))
+        self._flush()
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(t0, 0)
+            self._flush()
+            raise
+        self._add(t0, 1)
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        # Connection.execute ของ C ไม่ผ่าน self.cursor() จึงต้อง override แยก
+        return self.cursor().execute(sql, params)
+
+# ---------------- connection pool ----------------
+_deadline = threading.local()
+
+def query_deadline_exceeded() -> int:
+    # progress handler ของ SQLite: คืนค่าไม่ใช่ 0 = ยกเลิกคิวรี (OperationalError: interrupted)
+    deadline = getattr(_deadline, "at", None)
+    return 1 if deadline is not None and time.monotonic() > deadline else 0
+
+def ro_uri(path: str) -> str:
+    return f"{Path(path).resolve().as_uri()}?mode=ro"
+
+class ConnectionPool:
+    """connection อ่านอย่างเดียว 1 ตัวต่อ worker thread ใช้ซ้ำข้ามคำขอ
+
+    main = bgg_details.db, แนบ bgg_new.db ไว้เป็น schema ``base`` (หรือ bgg.db ไฟล์เดียวถ้าเป็นฐานข้อมูลรวม)
+    เมื่อไฟล์ฐานข้อมูลถูกแทนที่ (import ใหม่) ให้เรียก ``drain()``:
+    connection ที่ว่างอยู่จะถูกปิดทันที ส่วนที่กำลังใช้งานจะถูกปิดเมื่อคืนเข้าพูล
+    แล้วแต่ละ thread จะเปิดใหม่เองในคำขอถัดไป
+    """
+
+    def __init__(self, main_uri: str, attach: dict[str, str]):
+        self.main_uri = main_uri
+        self.attach = attach
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle: dict[sqlite3.Connection, int] = {}   # connection ที่ว่าง -> generation
+        self._generation = 0
+
+    def open(self) -> sqlite3.Connection:
+        """เปิด connection ใหม่นอกพูล (ผู้เรียกต้องปิดเอง)"""
+        # check_same_thread=False เพื่อให้ drain() ปิด connection ที่ว่างจาก thread อื่นได้
+        con = sqlite3.connect(self.main_uri, uri=True, check_same_thread=False,
+                              factory=TimedConnection if METRICS_ENABLED else sqlite3.Connection)
+        con.row_factory = sqlite3.Row
+        # ตั้งค่า connection ผ่าน Connection.execute ของ C ตรง ๆ (ไม่นับเป็นคิวรีใน metrics)
+        setup = functools.partial(sqlite3.Connection.execute, con)
+        for alias, uri in self.attach.items():
+            setup(f"ATTACH DATABASE ? AS {alias}", (uri,))
+        for schema in ["main", *self.attach]:
+            setup(f"PRAGMA {schema}.cache_size = -{SQLITE_CACHE_KIB}")
+            setup(f"PRAGMA {schema}.mmap_size = {SQLITE_MMAP_BYTES}")
+        setup("PRAGMA query_only = ON")
+        con.set_progress_handler(query_deadline_exceeded, 10_000)
+        return con
+
+    @contextmanager
+    def connection(self):
+        local = self._local
+        with self._lock:
+            con = getattr(local, "con", None)
+            if con is not None and self._idle.pop(con, None) != self._generation:
+                # ถูก drain ไปแล้ว (หรือเป็นของ generation เก่า)
+                con = None
+            generation = self._generation
+        if con is None:
+            con = self.open()
+            local.con = con
+        try:
+            yield con
+        finally:
+            with self._lock:
+                current = generation == self._generation
+                if current:
+                    self._idle[con] = generation
+            if not current:
+                local.con = None
+                con.close()
+
+    def drain(self):
+        """ปิด connection ทั้งหมดของ generation ปัจจุบัน (ใช้หลังเปลี่ยนไฟล์ฐานข้อมูล)"""
+        with self._lock:
+            self._generation += 1
+            stale, self._idle = list(self._idle), {}
+        for con in stale:
+            con.close()
+
+    def retarget(self, main_uri: str, attach: dict[str, str]):
+        """ชี้พูลไปฐานข้อมูลชุดใหม่ คำขอที่ค้างอยู่ใช้ connection เดิมจนจบ"""
+        with self._lock:
+            self.main_uri, self.attach = main_uri, attach
+        self.drain()
+
+# alias ของแต่ละไฟล์ใน connection: ไฟล์แรกเป็น main ที่เหลือถูก ATTACH
+DB_ALIASES = dict(zip(("main", "base"), DB_FILES))
+pool = ConnectionPool(ro_uri(DB_FILES[0]), {alias: ro_uri(path) for alias, path in DB_ALIASES.items()
+                                            if alias != "main"})
+
+def get_db():
+    return pool.connection()
+
+# ---------------- database version ----------------
+def db_version() -> tuple:
+    """ลายเซ็นไฟล์ฐานข้อมูล: (inode, mtime, size) ของไฟล์หลักและ -wal ของทุกไฟล์ที่ใช้
+
+    ใช้แทน PRAGMA data_version เพราะค่านั้นเป็นของแต่ละ connection
+    ส่วนสคริปต์ import จะลบไฟล์แล้วสร้างใหม่ (inode เปลี่ยน) หรือเขียนผ่าน WAL (-wal เปลี่ยน)
+    """
+    sig = []
+    for path in DB_FILES:
+        for p in (path, path + "-wal"):
+            try:
+                st = os.stat(p)
+                sig.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+    return tuple(sig)
+
+_version_lock = threading.Lock()
+_current_version = None
+
+def check_db_version() -> tuple:
+    """คืนเวอร์ชันปัจจุบัน ถ้าไฟล์เปลี่ยนจะ drain pool และล้าง cache ก่อน
+
+    snapshot mode: เวอร์ชัน = เวอร์ชันไฟล์ตอนโหลด snapshot ที่ใช้อยู่ (การสลับทำโดย watch_snapshot)
+    """
+    global _current_version
+    if SNAPSHOT_ENABLED:
+        return (_snapshot or load_initial_snapshot()).version
+    version = db_version()
+    if version != _current_version:
+        with _version_lock:
+            if version != _current_version:
+                if _current_version is not None:
+                    pool.drain()
+                    response_cache.clear()
+                _current_version = version
+    return version
+
+# ---------------- in-memory snapshot ----------------
+def resident_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource   # ไม่มี /proc: ใช้ค่าสูงสุดแทน
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class Snapshot:
+    """สำเนาฐานข้อมูลทุกไฟล์ใน memory (shared-cache ชื่อไม่ซ้ำต่อรุ่น) คัดลอกด้วย backup API
+
+    ฐานข้อมูลใน memory อยู่ตราบที่ยังมี connection เปิดอยู่ ``_keep`` ถือไว้ 1 ตัวต่อไฟล์
+    หลังสลับรุ่นแล้วปิด ``_keep`` ได้ทันที คำขอที่ค้างยังอ่านรุ่นเก่าผ่าน connection ของตัวเองจนจบ
+    """
+
+    _count = 0
+
+    def __init__(self, version: tuple):
+        Snapshot._count += 1
+        self.generation = Snapshot._count
+        self.version = version
+        self.uris: dict[str, str] = {}
+        self.bytes = 0
+        self._keep: list[sqlite3.Connection] = []
+        t0 = time.perf_counter()
+        try:
+            for alias, path in DB_ALIASES.items():
+                uri = f"file:bgg-snapshot-{self.generation}-{alias}?mode=memory&cache=shared"
+                dst = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                self._keep.append(dst)
+                src = sqlite3.connect(ro_uri(path), uri=True)
+                try:
+                    src.backup(dst)
+                finally:
+                    src.close()
+                page_size, pages = (dst.execute(f"PRAGMA {p}").fetchone()[0] for p in ("page_size", "page_count"))
+                self.bytes += page_size * pages
+                self.uris[alias] = uri
+        except BaseException:
+            self.close()
+            raise
+        self.load_seconds = time.perf_counter() - t0
+        self.loaded_at = time.time()
+        self.rss_bytes = resident_memory_bytes()
+
+    @classmethod
+    def load(cls) -> "Snapshot | None":
+        """โหลดจากไฟล์ปัจจุบัน คืน None ถ้าไฟล์เปลี่ยนระหว่างคัดลอก (importer ยังเขียนไม่เสร็จ)"""
+        version = db_version()
+        snapshot = cls(version)
+        if db_version() != version:
+            snapshot.close()
+            return None
+        return snapshot
+
+    def close(self):
+        for con in self._keep:
+            con.close()
+        self._keep = []
+
+    def stats(self) -> dict:
+        return {"generation": self.generation, "loaded_at": self.loaded_at,
+                "load_seconds": round(self.load_seconds, 3), "database_bytes": self.bytes,
+                "rss_bytes_after_load": self.rss_bytes}
+
+_snapshot: Snapshot | None = None
+_snapshot_lock = threading.Lock()
+
+def swap_snapshot(snapshot: Snapshot):
+    """สลับพูลไป snapshot ใหม่ ล้าง cache แล้วปล่อยรุ่นเก่า"""
+    global _snapshot, _current_version
+    with _version_lock:
+        old, _snapshot = _snapshot, snapshot
+        pool.retarget(snapshot.uris["main"], {a: u for a, u in snapshot.uris.items() if a != "main"})
+        response_cache.clear()
+        _current_version = snapshot.version
+    if old is not None:
+        old.close()
+    print(f"snapshot #{snapshot.generation}: {snapshot.bytes / 2**20:.1f} MiB "
+          f"in {snapshot.load_seconds:.2f}s, rss {snapshot.rss_bytes / 2**20:.1f} MiB")
+
+def load_initial_snapshot() -> Snapshot:
+    with _snapshot_lock:
+        if _snapshot is None:
+            snapshot = None
+            while snapshot is None:
+                snapshot = Snapshot.load()
+            swap_snapshot(snapshot)
+    return _snapshot
+
+def watch_snapshot(stop: threading.Event):
+    """เช็คไฟล์ทุก SNAPSHOT_POLL_SECONDS: ถ้าเปลี่ยนและนิ่งแล้ว 1 รอบ (import เสร็จ) โหลดรุ่นใหม่แล้วสลับ"""
+    seen = None
+    while not stop.wait(SNAPSHOT_POLL_SECONDS):
+        version = db_version()
+        if version != _snapshot.version and version == seen:
+            try:
+                snapshot = Snapshot.load()
+            except sqlite3.Error as e:
+                print(f"snapshot reload failed: {e}")
+                snapshot = None
+            if snapshot is not None:
+                swap_snapshot(snapshot)
+        seen = version
+
+# ---------------- response cache ----------------
+class CacheEntry:
+    __slots__ = ("version", "expires", "body", "encoded", "size")
+
+    def __init__(self, version, expires: float, body: bytes):
+        self.version = version
+        self.expires = expires
+        self.body = body
+        self.encoded: dict[str, bytes] = {}   # body ที่บีบอัดแล้วต่อ content-encoding
+        self.size = len(body)
+
+class ResponseCache:
+    """LRU + TTL เก็บ body JSON (bytes) ตาม key (route, params) จำกัดขนาดรวมเป็นไบต์
+
+    ขนาดนับรวม body ที่บีบอัดไว้ล่วงหน้าของแต่ละ entry ด้วย
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: OrderedDict[object, CacheEntry] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version) -> CacheEntry | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry.version == version and entry.expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, version, body: bytes) -> CacheEntry:
+        entry = CacheEntry(version, time.monotonic() + self.ttl, body)
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = entry
+            self.size += entry.size
+            self._evict()
+        return entry
+
+    def add_encoded(self, key, entry: CacheEntry, encoding: str, data: bytes):
+        with self._lock:
+            entry.encoded[encoding] = data
+            entry.size += len(data)
+            if self._data.get(key) is entry:
+                self.size += len(data)
+                self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        self.size -= self._data.pop(key).size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._data), "bytes": self.size, "max_bytes": self.max_bytes,
+                    "ttl_seconds": self.ttl, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions,
+                    "hit_ratio": self.hits / lookups if lookups else None}
+
+response_cache = ResponseCache(CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+
+# ---------------- JSON serialization ----------------
+def _json_default(o):
+    # endpoint คืน sqlite3.Row มาตรง ๆ ได้ ไม่ต้องแปลงเป็น dict ทั้งลิสต์ก่อน
+    if isinstance(o, sqlite3.Row):
+        return dict(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+if orjson is not None:
+    def dump_json(data) -> bytes:
+        return orjson.dumps(data, default=_json_default)
+else:
+    # รูปแบบเดียวกับ JSONResponse ของ FastAPI
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                                     default=_json_default)
+
+    def dump_json(data) -> bytes:
+        return _json_encoder.encode(data).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """JSONResponse ที่ข้าม jsonable_encoder: ใช้กับ payload ที่เป็น dict/list/Row ของ SQLite อยู่แล้ว"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):   # body ที่ serialize แล้ว (เช่นจาก response cache)
+            return content
+        return dump_json(content)
+
+# ---------------- compression ----------------
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+COMPRESSORS = {"gzip": _gzip}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+
+def negotiate_encoding(accept_encoding: str, offered: tuple[str, ...] = ("br", "gzip")) -> str | None:
+    """เลือก encoding จาก Accept-Encoding ตามลำดับใน offered (br ก่อน gzip) ข้ามตัวที่ q=0"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in offered:
+        if encoding in COMPRESSORS and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+class CompressionStats:
+    """จำนวนไบต์ก่อน/หลังบีบอัด ต่อ route"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[str, dict] = {}
+
+    def record(self, route: str, raw: int, sent: int, encoding: str | None):
+        with self._lock:
+            r = self.routes.setdefault(route, {"responses": 0, "compressed": 0, "raw_bytes": 0, "sent_bytes": 0})
+            r["responses"] += 1
+            r["compressed"] += encoding is not None
+            r["raw_bytes"] += raw
+            r["sent_bytes"] += sent
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {route: dict(r, saved_bytes=r["raw_bytes"] - r["sent_bytes"],
+                                ratio=r["sent_bytes"] / r["raw_bytes"] if r["raw_bytes"] else None)
+                    for route, r in self.routes.items()}
+
+compression_stats = CompressionStats()
+
+async def json_response(route: str, request: Request, body: bytes, key=None, entry: CacheEntry | None = None):
+    """ตอบ JSON พร้อมบีบอัดตาม Accept-Encoding ถ้ามี entry ใน cache จะบีบครั้งเดียวแล้วเก็บไว้ใช้ซ้ำ
+
+    body ใหญ่ (>= COMPRESS_THREAD_BYTES) บีบใน thread ไม่บล็อก event loop
+    """
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    headers = {"Vary": "Accept-Encoding"}
+    payload = body
+    if encoding:
+        payload = entry.encoded.get(encoding) if entry is not None else None
+        if payload is None:
+            if len(body) >= COMPRESS_THREAD_BYTES:
+                payload = await asyncio.to_thread(COMPRESSORS[encoding], body)
+            else:
+                payload = COMPRESSORS[encoding](body)
+            if entry is not None:
+                response_cache.add_encoded(key, entry, encoding, payload)
+        headers["Content-Encoding"] = encoding
+    compression_stats.record(route, len(body), len(payload), encoding)
+    return FastJSONResponse(payload, headers=headers)
+
+# ---------------- async database layer ----------------
+class DatabaseExecutor:
+    """รันงาน SQLite บน thread pool ของตัวเอง จำกัดจำนวนงานพร้อมกัน ความยาวคิว และเวลาต่อครั้ง
+
+    คิวเต็ม -> 503 (Retry-After) ทันที, เกินเวลา -> คิวรีถูก interrupt แล้วตอบ 504
+    คำขอที่ช้าจึงไม่กิน worker ของ uvicorn จนคำขออื่นค้าง
+    """
+
+    def __init__(self, workers: int, max_queue: int, timeout: float):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sqlite")
+        self._slots = asyncio.Semaphore(workers)
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _call(self, fn, args, kwargs):
+        _deadline.at = time.monotonic() + self.timeout
+        try:
+            return fn(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if str(e) == "interrupted":
+                self.timeouts += 1
+                raise HTTPException(504, "Database query timed out")
+            raise
+        finally:
+            _deadline.at = None
+
+    async def run(self, fn, *args, **kwargs):
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(503, "Database busy", headers={"Retry-After": "1"})
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._call, fn, args, kwargs)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "max_queue": self.max_queue, "timeout_seconds": self.timeout,
+                "running": self.running, "queue_depth": self.waiting, "completed": self.completed,
+                "rejected": self.rejected, "timeouts": self.timeouts}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+db_executor = DatabaseExecutor(DB_WORKERS, DB_MAX_QUEUE, DB_QUERY_TIMEOUT)
+
+def cached(route: str):
+    """แคชผลลัพธ์ของ endpoint ตาม route + พารามิเตอร์ จนกว่าฐานข้อมูลจะเปลี่ยนหรือหมด TTL
+
+    endpoint ที่ห่อยังเป็นฟังก์ชันธรรมดา (sync) และถูกรันบน db_executor เมื่อ cache miss
+    wrapper รับ ``request`` เพิ่ม (ใช้เลือก content-encoding) นอกเหนือจากพารามิเตอร์ของ endpoint
+    """
+    def decorator(fn):
+        def build(params):
+            return dump_json(fn(**params))
+
+        @functools.wraps(fn)
+        async def wrapper(request: Request, **params):
+            version = check_db_version()
+            key = (route, tuple(sorted(params.items())))
+            entry = response_cache.get(key, version)
+            if entry is None:
+                entry = response_cache.put(key, version, await db_executor.run(build, params))
+            return await json_response(route, request, entry.body, key, entry)
+
+        sig = inspect.signature(fn)
+        request_param = inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request)
+        wrapper.__signature__ = sig.replace(parameters=[request_param, *sig.parameters.values()])
+        return wrapper
+    return decorator
+
+class VersionedIndex:
+    """โครงสร้างใน memory ที่สร้างจากฐานข้อมูล 1 ชุดต่อเวอร์ชัน (``build(version, con)``)
+
+    เมื่อเวอร์ชันเปลี่ยน thread แรกที่เจอจะ build ใหม่แล้วสลับ reference ทีเดียว (atomic)
+    ระหว่างนั้นคำขออื่นใช้ของเดิมต่อได้โดยไม่ต้องรอ (รอเฉพาะตอนยังไม่เคยมีเลย)
+    """
 
-def get_db(path):
-    con = sqlite3.connect(path)
-    con.row_factory = sqlite3.Row
-    return con
+    instances: list["VersionedIndex"] = []
+
+    def __init__(self, name: str, build):
+        self.name = name
+        self._build = build
+        self._value = None
+        self._lock = threading.Lock()
+        VersionedIndex.instances.append(self)
+
+    def get(self, version):
+        value = self._value
+        if value is not None and value.version == version:
+            return value
+        if not self._lock.acquire(blocking=value is None):
+            return value
+        try:
+            if self._value is not None and self._value.version == version:
+                return self._value
+            # build อ่านทั้งตาราง ไม่ผูกกับ timeout ของคำขอ
+            _deadline.at = None
+            with get_db() as con:
+                self._value = self._build(version, con)
+            return self._value
+        finally:
+            self._lock.release()
+
+    async def current(self):
+        """ของเวอร์ชันปัจจุบัน ไปที่ executor เฉพาะตอนต้อง build"""
+        version = check_db_version()
+        value = self._value
+        if value is None or value.version != version:
+            value = await db_executor.run(self.get, version)
+        return value
+
+    def warm(self):
+        try:
+            self.get(check_db_version())
+        except sqlite3.Error as e:
+            print(f"{self.name} warm-up skipped: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop_watch = threading.Event()
+    if SNAPSHOT_ENABLED:
+        await asyncio.to_thread(load_initial_snapshot)
+        threading.Thread(target=watch_snapshot, args=(stop_watch,), name="snapshot-watch", daemon=True).start()
+    # สร้าง index ใน memory (autocomplete ฯลฯ) เบื้องหลัง ไม่บล็อก startup
+    for index in VersionedIndex.instances:
+        asyncio.get_running_loop().run_in_executor(None, index.warm)
+    yield
+    stop_watch.set()
+    db_executor.shutdown()
+    pool.drain()
+
+app = FastAPI(title="BGG API", lifespan=lifespan)
+
+# ---------------- ETag / conditional GET ----------------
+# route ที่ข้อมูลไม่ได้ขึ้นกับเวอร์ชันฐานข้อมูล หรือสุ่มใหม่ทุกครั้ง (ห้าม CDN/เบราว์เซอร์แคช)
+ETAG_EXCLUDE = ("/cache/", "/db/", "/metrics", "/games/random")
+
+def make_etag(version: tuple, path: str, query: list) -> str:
+    raw = repr((version, path, sorted(query))).encode("utf-8")
+    return 'W/"' + hashlib.sha1(raw).hexdigest()[:20] + '"'
+
+def if_none_match_tags(if_none_match: str) -> list[str]:
+    return [t.strip() for t in if_none_match.split(",")]
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # "*" ไม่นับที่นี่: ต้องรู้ก่อนว่ามี resource อยู่จริง (ดูหลังได้ 200 ใน conditional_get)
+    return etag.removeprefix("W/") in (t.removeprefix("W/") for t in if_none_match_tags(if_none_match))
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """ETag จากเวอร์ชันฐานข้อมูล + path + query: ถ้าตรงกับ If-None-Match ตอบ 304 ทันทีโดยไม่แตะ SQL"""
+    if request.method not in ("GET", "HEAD") or request.url.path.startswith(ETAG_EXCLUDE):
+        return await call_next(request)
+
+    etag = make_etag(check_db_version(), request.url.path, request.query_params.multi_items())
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={HTTP_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        if if_none_match and "*" in if_none_match_tags(if_none_match):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return response
+
+async def request_metrics(request: Request, call_next):
+    metrics.in_flight += 1
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.in_flight -= 1
+        metrics.observe_request(request.method, route_template(request.scope), status,
+                                time.perf_counter() - t0)
+
+def route_template(scope) -> str:
+    """path แบบ template (เช่น /games/{game_id}) เพื่อไม่ให้ label แตกตาม id"""
+    route = scope.get("route")
+    if route is None:
+        # ตอบไปก่อนถึง router (เช่น 304 จาก conditional_get)
+        route = next((r for r in app.router.routes if r.matches(scope)[0] == Match.FULL), None)
+    return route.path if route is not None else "unmatched"
+
+# ลงทะเบียนหลัง conditional_get จึงอยู่ชั้นนอกสุด (นับ 304 ด้วย); ปิด metrics = ไม่มี middleware นี้เลย
+if METRICS_ENABLED:
+    app.middleware("http")(request_metrics)
+
+# ---------------- keyset cursor ----------------
+def encode_cursor(sort_key, row_id: int) -> str:
+    raw = json.dumps([sort_key, row_id], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    """คืน (sort_key, id) จาก cursor ที่ encode_cursor สร้าง"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_key, row_id = json.loads(raw)
+        if not isinstance(sort_key, (str, int, float)) or not isinstance(row_id, int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+    return sort_key, row_id
+
+def next_cursor(rows: list[dict], limit: int, key: str):
+    if len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1][key], rows[-1]["id"])
+
+if UNIFIED:
+    # ฐานข้อมูลรวม: listings.game_id = games.id (integer) ไม่ต้องจับคู่ url ข้ามไฟล์
+    LISTING_TOTAL_SQL = "SELECT COALESCE(SUM(games), 0) FROM category_counts"
+    LIST_GAMES_SQL = """
+        SELECT l.id, l.category, l.name, l.year, g.detail_url AS url, l.image_url,
+               g.average_rating, l.game_id
+        FROM (
+            SELECT id, game_id, category, name, year, image_url
+            FROM listings
+            {where}
+            ORDER BY name, id
+            LIMIT ? OFFSET ?
+        ) l
+        JOIN games g ON g.id = l.game_id
+        ORDER BY l.name, l.id
+    """
+else:
+    # bgg_new.db ถูกแนบเป็น base แล้ว join rating ในคิวรีเดียว (แทนการยิงทีละแถว)
+    LISTING_TOTAL_SQL = "SELECT COALESCE(SUM(games), 0) FROM base.category_counts"
+    LIST_GAMES_SQL = """
+        SELECT b.id, b.category, b.name, b.year, b.url, b.image_url,
+               d.average_rating, d.id AS game_id
+        FROM (
+            SELECT id, category, name, year, url, image_url
+            FROM base.games
+            {where}
+            ORDER BY name, id
+            LIMIT ? OFFSET ?
+        ) b
+        LEFT JOIN games d ON d.detail_url = b.url
+        ORDER BY b.name, b.id
+    """
 
 @app.get("/games")
-def list_games(page: int = Query(1, ge=1), limit: int = Query(20, ge=1, le=100)):
-    offset = (page - 1) * limit
-    con1 = get_db(DB_BASE)
-    cur1 = con1.cursor()
-    cur1.execute("SELECT COUNT(*) FROM games")
-    total = cur1.fetchone()[0]
-
-    cur1.execute("""
-        SELECT id, category, name, year, url, image_url
-        FROM games
-        ORDER BY name
-        LIMIT ? OFFSET ?
-    """, (limit, offset))
-    rows = [dict(r) for r in cur1.fetchall()]
-    con1.close()
-
-    # เติม rating จาก bgg_details.db
-    con2 = get_db(DB_DETAILS)
-    cur2 = con2.cursor()
-    for r in rows:
-        url = r["url"]
-        cur2.execute("SELECT average_rating FROM games WHERE detail_url=?", (url,))
-        detail = cur2.fetchone()
-        r["average_rating"] = detail["average_rating"] if detail else None
-    con2.close()
+@cached("games")
+def list_games(page: int = Query(1, ge=1), limit: int = Query(20, ge=1, le=100),
+               cursor: str | None = None):
+    # มี cursor = keyset (name, id) ต่อจากหน้าก่อน, ไม่มี = แบ่งหน้าด้วย page เหมือนเดิม
+    if cursor:
+        name, last_id = decode_cursor(cursor)
+        where, params = "WHERE (name, id) > (?, ?)", (name, last_id, limit, 0)
+    else:
+        where, params = "", (limit, (page - 1) * limit)
 
-    return {"page": page, "limit": limit, "total": total, "games": rows}
+    with get_db() as con:
+        cur = con.cursor()
+        cur.execute(LISTING_TOTAL_SQL)
+        total = cur.fetchone()[0]
+        cur.execute(LIST_GAMES_SQL.format(where=where), params)
+        rows = cur.fetchall()
+
+    result = {"page": None if cursor else page, "limit": limit, "total": total, "games": rows}
+    result["next_cursor"] = next_cursor(rows, limit, "name")
+    return result
 
 @app.get("/categories")
-def list_categories():
-    con = get_db(DB_DETAILS); cur = con.cursor()
-    cur.execute("SELECT DISTINCT category FROM game_categories ORDER BY category")
-    cats = [r[0] for r in cur.fetchall()]
-    con.close()
+@cached("categories")
+def list_categories(counts: bool = False):
+    # อ่านจาก category_stats (สร้างตอน migrate) แทน DISTINCT ทั้งตาราง
+    with get_db() as con:
+        cur = con.cursor()
+        if counts:
+            cur.execute("SELECT category, games, avg_rating, avg_weight FROM category_stats ORDER BY category")
+            return {"categories": cur.fetchall()}
+        cur.execute("SELECT category FROM category_stats ORDER BY category")
+        cats = [r[0] for r in cur.fetchall()]
     return {"categories": cats}
 
 @app.get("/categories/{category}/games")
+@cached("category_games")
 def games_by_category(category: str,
                       page: int = Query(1, ge=1),
-                      limit: int = Query(20, ge=1, le=100)):
-    offset = (page - 1) * limit
-    con = get_db(DB_DETAILS); cur = con.cursor()
-    cur.execute("""
-        SELECT COUNT(*)
-        FROM game_categories gc
-        JOIN games g ON g.id = gc.game_id
-        WHERE gc.category = ?
-    """, (category,))
-    total = cur.fetchone()[0]
-
-    cur.execute("""
-        SELECT g.id, g.title, g.detail_url, g.players_min, g.players_max, g.average_rating
-        FROM game_categories gc
-        JOIN games g ON g.id = gc.game_id
-        WHERE gc.category = ?
-        ORDER BY g.title
-        LIMIT ? OFFSET ?
-    """, (category, limit, offset))
-    rows = [dict(r) for r in cur.fetchall()]
-    con.close()
-    return {"category": category, "page": page, "limit": limit, "total": total, "games": rows}
+                      limit: int = Query(20, ge=1, le=100),
+                      cursor: str | None = None):
+    with get_db() as con:
+        cur = con.cursor()
+        cur.execute("SELECT games FROM category_stats WHERE category = ?", (category,))
+        stats = cur.fetchone()
+        total = stats[0] if stats else 0
+
+        # ไล่ idx_gc_cat_title (category, title, game_id) ของหมวดนี้อย่างเดียว แล้ว join games ทีละ PK
+        # อ่านแค่ limit (+ offset) แถว หน้าสุดท้ายหรือหมวดเล็กก็ไม่ต้องไล่ title ของทั้งแคตตาล็อก
+        if cursor:
+            title, last_id = decode_cursor(cursor)
+            cur.execute("""
+                SELECT g.id, g.title, g.detail_url, g.players_min, g.players_max, g.average_rating
+                FROM game_categories gc
+                JOIN games g ON g.id = gc.game_id
+                WHERE gc.category = ? AND (gc.title, gc.game_id) > (?, ?)
+                ORDER BY gc.title, gc.game_id
+                LIMIT ?
+            """, (category, title, last_id, limit))
+        else:
+            cur.execute("""
+                SELECT g.id, g.title, g.detail_url, g.players_min, g.players_max, g.average_rating
+                FROM game_categories gc
+                JOIN games g ON g.id = gc.game_id
+                WHERE gc.category = ?
+                ORDER BY gc.title, gc.game_id
+                LIMIT ? OFFSET ?
+            """, (category, limit, (page - 1) * limit))
+        rows = cur.fetchall()
+    return {"category": category, "page": None if cursor else page, "limit": limit, "total": total,
+            "games": rows, "next_cursor": next_cursor(rows, limit, "title")}
+
+# ---------------- leaderboards ----------------
+# category_leaderboard สร้างตอน migrate/import: PK (category, metric, value DESC, game_id)
+LEADERBOARD_METRICS = ("average_rating", "weight_5", "year")
+
+@app.get("/categories/{category}/top")
+@cached("category_top")
+def category_top(category: str,
+                 by: str = Query("average_rating", description="average_rating | weight_5 | year"),
+                 limit: int = Query(10, ge=1, le=100)):
+    if by not in LEADERBOARD_METRICS:
+        raise HTTPException(400, f"by must be one of: {', '.join(LEADERBOARD_METRICS)}")
+    # อ่านแค่ limit แถวแรกของ prefix (category, metric) ไม่ต้องเรียงทั้งหมวด
+    with get_db() as con:
+        rows = con.execute("""
+            SELECT g.id, g.title, g.detail_url, g.primary_image, g.average_rating, g.weight_5, g.year
+            FROM category_leaderboard lb
+            JOIN games g ON g.id = lb.game_id
+            WHERE lb.category = ? AND lb.metric = ?
+            ORDER BY lb.value DESC, lb.game_id
+            LIMIT ?
+        """, (category, by, limit)).fetchall()
+    return {"category": category, "by": by,
+            "games": [dict(r, rank=rank) for rank, r in enumerate(rows, 1)]}
+
+# ---------------- category statistics ----------------
+STATS_PERCENTILES = (10, 25, 50, 75, 90)
+STATS_RATING_EDGES = np.arange(1, 10.01, 0.5)
+STATS_WEIGHT_EDGES = np.arange(1, 5.01, 0.25)
+STATS_YEAR_START = 1900   # histogram ปีเป็นช่วงละ 10 ปี ปีก่อนหน้านี้นับรวมในช่องแรก
+
+def distribution(values: np.ndarray, edges: np.ndarray | None = None, integer: bool = False,
+                 fold_below: bool = False) -> dict:
+    """สรุปคอลัมน์ตัวเลข 1 คอลัมน์ (nan = ไม่มีค่า): count, mean, min/max, percentile, histogram
+
+    histogram ไม่นับค่าที่อยู่นอกช่วง edges ยกเว้น fold_below = นับค่าที่น้อยกว่าขอบล่างรวมในช่องแรก
+    """
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {"count": 0}
+    cast = int if integer else float
+    result = {"count": int(len(values)), "mean": round(float(values.mean()), 4),
+              "min": cast(values.min()), "max": cast(values.max()),
+              "percentiles": dict(zip((f"p{q}" for q in STATS_PERCENTILES),
+                                      np.percentile(values, STATS_PERCENTILES).round(4).tolist()))}
+    if edges is not None:
+        counts, _ = np.histogram(np.maximum(values, edges[0]) if fold_below else values, edges)
+        result["histogram"] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    return result
+
+class CategoryStatsIndex:
+    """คอลัมน์ตัวเลขของ games เป็น NumPy array (แถวเรียงตาม id) + ตำแหน่งแถวของสมาชิกแต่ละหมวด
+
+    สรุปทุกหมวดด้วย vectorized aggregate ครั้งเดียวต่อเวอร์ชัน แล้วเก็บเป็น JSON bytes พร้อมตอบ
+    """
+
+    COLUMNS = ("average_rating", "weight_5", "time_min", "time_max", "year")
+
+    def __init__(self, version, con: sqlite3.Connection):
+        self.version = version
+        rows = con.execute(f"SELECT id, {', '.join(self.COLUMNS)} FROM games ORDER BY id").fetchall()
+        data = np.array([tuple(r) for r in rows], dtype=np.float64).reshape(-1, len(self.COLUMNS) + 1)
+        ids = data[:, 0].astype(np.int64)
+        columns = {name: data[:, i + 1] for i, name in enumerate(self.COLUMNS)}
+
+        # id สมาชิกต่อหมวดมาเป็น JSON array ก้อนเดียว (ไม่ต้องวนทีละแถวใน Python)
+        members = {category: json.loads(game_ids) for category, game_ids in con.execute(
+            "SELECT category, json_group_array(game_id) FROM game_categories GROUP BY category")}
+
+        years = columns["year"][~np.isnan(columns["year"])]
+        last_decade = int(years.max()) // 10 * 10 if len(years) else STATS_YEAR_START
+        year_edges = np.arange(STATS_YEAR_START, max(last_decade, STATS_YEAR_START) + 11, 10)
+
+        self.stats = {}
+        for category, game_ids in members.items():
+            game_ids = np.array(game_ids, dtype=np.int64)
+            rows_of = np.searchsorted(ids, game_ids)
+            rows_of = rows_of[(rows_of < len(ids)) & (ids[np.minimum(rows_of, len(ids) - 1)] == game_ids)]
+            col = {name: values[rows_of] for name, values in columns.items()}
+            self.stats[category] = {
+                "category": category,
+                "games": int(len(rows_of)),
+                "average_rating": distribution(col["average_rating"], STATS_RATING_EDGES),
+                "weight_5": distribution(col["weight_5"], STATS_WEIGHT_EDGES),
+                "time_min": distribution(col["time_min"], integer=True),
+                "time_max": distribution(col["time_max"], integer=True),
+                "year": distribution(col["year"], year_edges, integer=True, fold_below=True),
+            }
+        # body ต่อหมวด + ทุกหมวด เป็น CacheEntry ของเวอร์ชันนี้: แต่ละ encoding บีบครั้งเดียวแล้วเก็บไว้ใน entry
+        self.entries = {category: CacheEntry(version, float("inf"), dump_json(stats))
+                        for category, stats in self.stats.items()}
+        self.all_entry = CacheEntry(version, float("inf"),
+                                    dump_json({"categories": [self.stats[c] for c in sorted(self.stats)]}))
+
+category_stats_index = VersionedIndex("category_stats", CategoryStatsIndex)
+
+@app.get("/categories/stats")
+async def all_category_stats(request: Request):
+    index = await category_stats_index.current()
+    entry = index.all_entry
+    return await json_response("category_stats_all", request, entry.body, ("category_stats_all",), entry)
+
+@app.get("/categories/{category}/stats")
+async def category_stats(request: Request, category: str):
+    index = await category_stats_index.current()
+    entry = index.entries.get(category)
+    if entry is None:
+        raise HTTPException(404, "Category not found")
+    return await json_response("category_stats", request, entry.body, ("category_stats", category), entry)
+
+# ---------------- faceted filter ----------------
+# facet ต่อ bucket (key ของ JSON object เป็นสตริง)
+FACET_BUCKETS = {
+    "weight":   "CAST(weight_5 AS INTEGER)",
+    "rating":   "CAST(average_rating AS INTEGER)",
+    "playtime": "CASE WHEN time_max <= 30 THEN '0-30' WHEN time_max <= 60 THEN '31-60' "
+                "WHEN time_max <= 120 THEN '61-120' ELSE '120+' END",
+}
+
+@app.get("/games/filter")
+@cached("filter")
+def filter_games(category: str | None = None,
+                 players: int | None = Query(None, ge=1),
+                 time_max: int | None = Query(None, ge=1),
+                 age: int | None = Query(None, ge=0),
+                 weight_min: float | None = Query(None, ge=0, le=5),
+                 weight_max: float | None = Query(None, ge=0, le=5),
+                 rating_min: float | None = Query(None, ge=0, le=10),
+                 page: int = Query(1, ge=1),
+                 limit: int = Query(20, ge=1, le=100)):
+    conds, params = [], []
+    if category is not None:
+        conds.append("g.id IN (SELECT game_id FROM game_categories WHERE category = ?)")
+        params.append(category)
+    if players is not None:
+        conds.append("g.players_min <= ? AND g.players_max >= ?")
+        params += [players, players]
+    if time_max is not None:
+        conds.append("g.time_max <= ?")
+        params.append(time_max)
+    if age is not None:
+        conds.append("g.age_plus <= ?")
+        params.append(age)
+    if weight_min is not None:
+        conds.append("g.weight_5 >= ?")
+        params.append(weight_min)
+    if weight_max is not None:
+        conds.append("g.weight_5 <= ?")
+        params.append(weight_max)
+    if rating_min is not None:
+        conds.append("g.average_rating >= ?")
+        params.append(rating_min)
+    where = "WHERE " + " AND ".join(conds) if conds else ""
+
+    # กรองครั้งเดียวลง CTE แล้วนับ total / facet / ตัดหน้า จากชุดเดียวกันในคิวรีเดียว
+    facets = ",\n".join(
+        f"(SELECT json_group_object(bucket, n) FROM (SELECT {expr} AS bucket, COUNT(*) AS n FROM f "
+        f"WHERE bucket IS NOT NULL GROUP BY bucket)) AS facet_{name}"
+        for name, expr in FACET_BUCKETS.items()
+    )
+    with get_db() as con:
+        row = con.execute(f"""
+            WITH f AS MATERIALIZED (
+                SELECT g.id, g.title, g.detail_url, g.players_min, g.players_max, g.time_min,
+                       g.time_max, g.age_plus, g.weight_5, g.average_rating
+                FROM games g
+                {where}
+            )
+            SELECT
+                (SELECT COUNT(*) FROM f) AS total,
+                {facets},
+                (SELECT json_group_array(json_object(
+                     'id', id, 'title', title, 'detail_url', detail_url,
+                     'players_min', players_min, 'players_max', players_max,
+                     'time_min', time_min, 'time_max', time_max, 'age_plus', age_plus,
+                     'weight_5', weight_5, 'average_rating', average_rating))
+                 FROM (SELECT * FROM f ORDER BY title, id LIMIT ? OFFSET ?)) AS games
+        """, (*params, limit, (page - 1) * limit)).fetchone()
+
+    return {"page": page, "limit": limit, "total": row["total"],
+            "facets": {name: json.loads(row[f"facet_{name}"]) for name in FACET_BUCKETS},
+            "games": json.loads(row["games"])}
+
+# ---------------- random sampling ----------------
+RANDOM_MAX         = 50
+RANDOM_MAX_PLAYERS = 20
+
+class RandomIndex:
+    """id เกมเป็น dense array ต่อ key (หมวด, จำนวนผู้เล่น) สุ่มตำแหน่งใน array ได้ O(n) ไม่ต้อง ORDER BY RANDOM()
+
+    None ใน key = ไม่กรองด้านนั้น แต่ละ array เรียงตาม id จึงสุ่มด้วย seed เดิมได้ผลเดิม (ในเวอร์ชันเดียวกัน)
+    """
+
+    def __init__(self, version, con: sqlite3.Connection):
+        self.version = version
+        counts = {}   # game id -> จำนวนผู้เล่นที่รองรับ
+        for game_id, lo, hi in con.execute("SELECT id, players_min, players_max FROM games ORDER BY id"):
+            counts[game_id] = range(lo, min(hi, RANDOM_MAX_PLAYERS) + 1) if lo and hi else range(0)
+
+        lists = defaultdict(list)
+        for game_id, players in counts.items():
+            lists[None, None].append(game_id)
+            for p in players:
+                lists[None, p].append(game_id)
+        for game_id, category in con.execute(
+                "SELECT game_id, category FROM game_categories ORDER BY category, game_id"):
+            players = counts.get(game_id)
+            if players is None:
+                continue
+            lists[category, None].append(game_id)
+            for p in players:
+                lists[category, p].append(game_id)
+        self.ids = {key: array("i", ids) for key, ids in lists.items()}
+
+    def sample(self, category: str | None, players: int | None, n: int, seed: int | None) -> list[int]:
+        ids = self.ids.get((category, players))
+        if not ids:
+            return []
+        rnd = random.Random(seed)
+        return [ids[i] for i in rnd.sample(range(len(ids)), min(n, len(ids)))]
+
+random_index = VersionedIndex("random", RandomIndex)
+
+def fetch_random_rows(ids: list[int]) -> list[dict]:
+    with get_db() as con:
+        rows = con.execute("""
+            SELECT g.id, g.title, g.detail_url, g.primary_image, g.players_min, g.players_max,
+                   g.time_max, g.weight_5, g.average_rating
+            FROM games g
+            WHERE g.id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(ids),)).fetchall()
+    found = {r["id"]: r for r in rows}
+    return [found[i] for i in ids if i in found]
+
+@app.get("/games/random")
+async def random_games(request: Request,
+                       category: str | None = None,
+                       players: int | None = Query(None, ge=1, le=RANDOM_MAX_PLAYERS),
+                       limit: int = Query(1, ge=1, le=RANDOM_MAX),
+                       seed: int | None = None):
+    # ใส่ seed = ผลเดิมทุกครั้งจนกว่าฐานข้อมูลจะเปลี่ยน, ไม่ใส่ = สุ่มใหม่ทุกคำขอ
+    index = await random_index.current()
+    ids = index.sample(category, players, limit, seed)
+    games = await db_executor.run(fetch_random_rows, ids)
+    body = dump_json({"category": category, "players": players, "limit": limit, "seed": seed, "games": games})
+    return await json_response("random", request, body)
+
+# รายละเอียดเกมทั้งก้อนในคิวรีเดียว: ตารางลูกรวมเป็น JSON array ด้วย subquery ที่ seek ตาม index game_id
+GAME_DETAIL_COLUMNS = """
+    g.*,
+    (SELECT json_group_array(category) FROM (SELECT category FROM game_categories
+        WHERE game_id = g.id ORDER BY category))                              AS categories,
+    (SELECT json_group_array(url) FROM (SELECT url FROM gallery_images
+        WHERE game_id = g.id ORDER BY id))                                    AS gallery_images,
+    (SELECT json_group_array(name) FROM (SELECT name FROM alternate_names
+        WHERE game_id = g.id ORDER BY id))                                    AS alternate_names,
+    (SELECT json_group_array(name) FROM (SELECT e.name FROM game_designers l
+        JOIN designers e ON e.id = l.designer_id
+        WHERE l.game_id = g.id ORDER BY l.position))                          AS designers,
+    (SELECT json_group_array(name) FROM (SELECT e.name FROM game_artists l
+        JOIN artists e ON e.id = l.artist_id
+        WHERE l.game_id = g.id ORDER BY l.position))                          AS artists,
+    (SELECT json_group_array(name) FROM (SELECT e.name FROM game_publishers l
+        JOIN publishers e ON e.id = l.publisher_id
+        WHERE l.game_id = g.id ORDER BY l.position))                          AS publishers,
+    (SELECT json_group_array(designer_id) FROM (SELECT designer_id FROM game_designers
+        WHERE game_id = g.id ORDER BY position))                              AS designer_ids,
+    (SELECT json_group_array(artist_id) FROM (SELECT artist_id FROM game_artists
+        WHERE game_id = g.id ORDER BY position))                              AS artist_ids,
+    (SELECT json_group_array(publisher_id) FROM (SELECT publisher_id FROM game_publishers
+        WHERE game_id = g.id ORDER BY position))                              AS publisher_ids
+"""
+DETAIL_LISTS = ("categories", "gallery_images", "alternate_names", "designers", "artists", "publishers")
+# id คู่กับชื่อในลำดับเดียวกัน (ใช้กับ /designers/{id}, /artists/{id}, /publishers/{id})
+DETAIL_ID_LISTS = ("designer_ids", "artist_ids", "publisher_ids")
+
+def detail_from_row(row: sqlite3.Row) -> dict:
+    result = dict(row)
+    for key in DETAIL_LISTS + DETAIL_ID_LISTS:
+        result[key] = json.loads(result[key])
+    return result
+
+# ---------------- batch lookup ----------------
+# รายการลูก -> (ตาราง, คอลัมน์ค่า, ลำดับภายในเกม) ดึงทีละรายการด้วย IN แล้วจัดกลุ่มใน Python
+BATCH_CHILDREN = {
+    "categories":      ("game_categories", "category", "category"),
+    "gallery_images":  ("gallery_images",  "url",      "id"),
+    "alternate_names": ("alternate_names", "name",     "id"),
+    "designers":       ("game_designers l JOIN designers e ON e.id = l.designer_id",    "e.name", "l.position"),
+    "artists":         ("game_artists l JOIN artists e ON e.id = l.artist_id",          "e.name", "l.position"),
+    "publishers":      ("game_publishers l JOIN publishers e ON e.id = l.publisher_id", "e.name", "l.position"),
+    "designer_ids":    ("game_designers",  "designer_id",  "position"),
+    "artist_ids":      ("game_artists",    "artist_id",    "position"),
+    "publisher_ids":   ("game_publishers", "publisher_id", "position"),
+}
+
+def parse_ids(ids: str) -> list[int]:
+    try:
+        return [int(x) for x in ids.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(400, "ids must be comma-separated integers")
+
+def fetch_games_batch(ids: list[int]) -> dict:
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise HTTPException(400, "No ids given")
+    if len(ids) > BATCH_MAX_IDS:
+        raise HTTPException(400, f"At most {BATCH_MAX_IDS} ids per batch")
+
+    id_list = json.dumps(ids)
+    with get_db() as con:
+        cur = con.cursor()
+        cur.execute("SELECT * FROM games WHERE id IN (SELECT value FROM json_each(?))", (id_list,))
+        games = {r["id"]: dict(r) for r in cur.fetchall()}
+        for g in games.values():
+            for key in BATCH_CHILDREN:
+                g[key] = []
+
+        for key, (table, column, order) in BATCH_CHILDREN.items():
+            cur.execute(f"""
+                SELECT game_id, {column} FROM {table}
+                WHERE game_id IN (SELECT value FROM json_each(?))
+                ORDER BY game_id, {order}
+            """, (id_list,))
+            for game_id, value in cur.fetchall():
+                games[game_id][key].append(value)
+
+    return {"games": [games[i] for i in ids if i in games],
+            "missing": [i for i in ids if i not in games]}
+
+@app.get("/games/batch")
+@cached("games_batch")
+def games_batch(ids: str = Query(..., description="comma-separated game ids")):
+    return fetch_games_batch(parse_ids(ids))
+
+@app.post("/games/batch")
+async def games_batch_post(request: Request, ids: list[int] = Body(..., embed=True)):
+    body = await db_executor.run(lambda: dump_json(fetch_games_batch(ids)))
+    return await json_response("games_batch", request, body)
 
 @app.get("/games/{game_id}")
+@cached("game_detail")
 def game_detail(game_id: int):
-    con = get_db(); cur = con.cursor()
-    cur.execute("SELECT * FROM games WHERE id=?", (game_id,))
-    game = cur.fetchone()
+    with get_db() as con:
+        game = con.execute(f"SELECT {GAME_DETAIL_COLUMNS} FROM games g WHERE g.id = ?",
+                           (game_id,)).fetchone()
     if not game:
-        con.close()
         raise HTTPException(404, "Game not found")
+    return detail_from_row(game)
 
-    result = dict(game)
+# ---------------- similar games ----------------
+# game_neighbors (top-k ต่อเกม) สร้างล่วงหน้าด้วย build_similarity.py
+SIMILAR_MAX = 20
 
-    # เพิ่มหมวดของเกมนี้
-    cur.execute("SELECT category FROM game_categories WHERE game_id=? ORDER BY category", (game_id,))
-    result["categories"] = [r[0] for r in cur.fetchall()]
+@app.get("/games/{game_id}/similar")
+@cached("similar")
+def similar_games(game_id: int, limit: int = Query(10, ge=1, le=SIMILAR_MAX)):
+    with get_db() as con:
+        cur = con.cursor()
+        if not cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'game_neighbors'").fetchone():
+            raise HTTPException(503, "Similarity index not built (run build_similarity.py)")
+        if not cur.execute("SELECT 1 FROM games WHERE id = ?", (game_id,)).fetchone():
+            raise HTTPException(404, "Game not found")
+        cur.execute("""
+            SELECT n.rank, n.score, g.id, g.title, g.detail_url, g.primary_image, g.players_min,
+                   g.players_max, g.time_max, g.weight_5, g.average_rating
+            FROM game_neighbors n
+            JOIN games g ON g.id = n.neighbor_id
+            WHERE n.game_id = ?
+            ORDER BY n.rank
+            LIMIT ?
+        """, (game_id, limit))
+        rows = cur.fetchall()
+    return {"id": game_id, "limit": limit, "games": rows}
 
-    # ดึงตารางลูกอื่น ๆ
-    cur.execute("SELECT url FROM gallery_images WHERE game_id=?", (game_id,))
-    result["gallery_images"] = [r[0] for r in cur.fetchall()]
+# ---------------- designers / artists / publishers ----------------
+# entity -> (ตาราง link, คอลัมน์ id) เหมือน import_bgg_details.ENTITY_LINKS
+ENTITY_LINKS = {
+    "designers":  ("game_designers",  "designer_id"),
+    "artists":    ("game_artists",    "artist_id"),
+    "publishers": ("game_publishers", "publisher_id"),
+}
 
-    for tbl, key in [
-        ("alternate_names", "alternate_names"),
-        ("designers", "designers"),
-        ("artists", "artists"),
-        ("publishers", "publishers"),
-    ]:
-        cur.execute(f"SELECT name FROM {tbl} WHERE game_id=?", (game_id,))
-        result[key] = [r[0] for r in cur.fetchall()]
+def entity_games(entity: str, entity_id: int, page: int, limit: int, cursor: str | None) -> dict:
+    """เกมของ designer / artist / publisher 1 ราย เรียงตามชื่อ: seek index (entity, game_id) ของตาราง link"""
+    link_table, id_column = ENTITY_LINKS[entity]
+    with get_db() as con:
+        cur = con.cursor()
+        found = cur.execute(f"SELECT id, name FROM {entity} WHERE id = ?", (entity_id,)).fetchone()
+        if not found:
+            raise HTTPException(404, f"{entity[:-1].capitalize()} not found")
+        cur.execute(f"SELECT COUNT(DISTINCT game_id) FROM {link_table} WHERE {id_column} = ?", (entity_id,))
+        total = cur.fetchone()[0]
 
-    con.close()
-    return result
+        where, params = "", []
+        if cursor:
+            title, last_id = decode_cursor(cursor)
+            where, params = "AND (g.title, g.id) > (?, ?)", [title, last_id]
+        cur.execute(f"""
+            SELECT g.id, g.title, g.detail_url, g.players_min, g.players_max, g.average_rating
+            FROM games g
+            WHERE g.id IN (SELECT game_id FROM {link_table} WHERE {id_column} = ?)
+              {where}
+            ORDER BY g.title, g.id
+            LIMIT ? OFFSET ?
+        """, (entity_id, *params, limit, 0 if cursor else (page - 1) * limit))
+        rows = cur.fetchall()
+    return {"id": found["id"], "name": found["name"], "page": None if cursor else page, "limit": limit,
+            "total": total, "games": rows, "next_cursor": next_cursor(rows, limit, "title")}
+
+@app.get("/designers/{designer_id}")
+@cached("designer")
+def designer_games(designer_id: int,
+                   page: int = Query(1, ge=1),
+                   limit: int = Query(20, ge=1, le=100),
+                   cursor: str | None = None):
+    return entity_games("designers", designer_id, page, limit, cursor)
+
+@app.get("/artists/{artist_id}")
+@cached("artist")
+def artist_games(artist_id: int,
+                 page: int = Query(1, ge=1),
+                 limit: int = Query(20, ge=1, le=100),
+                 cursor: str | None = None):
+    return entity_games("artists", artist_id, page, limit, cursor)
+
+@app.get("/publishers/{publisher_id}")
+@cached("publisher")
+def publisher_games(publisher_id: int,
+                    page: int = Query(1, ge=1),
+                    limit: int = Query(20, ge=1, le=100),
+                    cursor: str | None = None):
+    return entity_games("publishers", publisher_id, page, limit, cursor)
+
+# ---------------- autocomplete ----------------
+AUTOCOMPLETE_MAX = 20
+AUTOCOMPLETE_HOT_PREFIX = 3   # prefix ยาวไม่เกินนี้ (ช่วงใน array กว้าง) เตรียมผลไว้ตอน build
+
+def normalize_name(s: str) -> str:
+    """ตัวพิมพ์เล็ก ตัดเครื่องหมายกำกับเสียง ยุบช่องว่าง ("Café  Ámerica" -> "cafe america")"""
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return " ".join(s.casefold().split())
+
+class AutocompleteIndex:
+    """ชื่อเกม + ชื่ออื่นที่ normalize แล้ว เรียงเป็น list เดียว หา prefix ด้วย bisect
+
+    เกมถูกจัดอันดับตาม average_rating (0 = ดีที่สุด) ทุกชื่อเก็บอันดับเกมไว้ใน array คู่กัน
+    ผลของ prefix ก็คืออันดับน้อยสุดในช่วงที่ match; prefix สั้นที่ช่วงกว้างมากคำนวณไว้แล้วใน ``hot``
+    """
+
+    def __init__(self, version, con: sqlite3.Connection):
+        self.version = version
+        games = con.execute("""
+            SELECT id, title, average_rating FROM games
+            ORDER BY average_rating IS NULL, average_rating DESC, id
+        """).fetchall()
+        rank_of = {g["id"]: rank for rank, g in enumerate(games)}
+        self.games = [(g["id"], g["title"], g["average_rating"]) for g in games]
+
+        entries = {(normalize_name(g["title"]), rank_of[g["id"]]) for g in games}
+        entries.update((normalize_name(name), rank_of[game_id])
+                       for game_id, name in con.execute("SELECT game_id, name FROM alternate_names")
+                       if game_id in rank_of)
+        entries = sorted(e for e in entries if e[0])
+        self.keys = [k for k, _ in entries]
+        self.ranks = array("i", (r for _, r in entries))
+
+        # ไล่ชื่อตามอันดับเกม: อันดับแรก ๆ ที่เจอของแต่ละ prefix สั้น = ผลของ prefix นั้น
+        self.hot: dict[str, list[int]] = {}
+        for key, rank in sorted(entries, key=lambda e: e[1]):
+            for n in range(1, min(len(key), AUTOCOMPLETE_HOT_PREFIX) + 1):
+                found = self.hot.setdefault(key[:n], [])
+                if len(found) < AUTOCOMPLETE_MAX and (not found or found[-1] != rank):
+                    found.append(rank)
+
+    def lookup(self, prefix: str, limit: int) -> list[dict]:
+        # เว้นวรรคท้ายมีความหมาย ("mar " ไม่เอา "mario")
+        prefix = normalize_name(prefix) + (" " if prefix[-1:].isspace() else "")
+        if not prefix.strip():
+            return []
+        if len(prefix) <= AUTOCOMPLETE_HOT_PREFIX:
+            ranks = self.hot.get(prefix, [])[:limit]
+        else:
+            lo = bisect.bisect_left(self.keys, prefix)
+            hi = bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+            ranks = sorted(set(self.ranks[lo:hi]))[:limit]
+        return [{"id": game_id, "title": title, "average_rating": rating}
+                for game_id, title, rating in (self.games[r] for r in ranks)]
+
+autocomplete_index = VersionedIndex("autocomplete", AutocompleteIndex)
+
+@app.get("/autocomplete")
+async def autocomplete(request: Request,
+                       prefix: str = Query(..., min_length=1, max_length=100),
+                       limit: int = Query(10, ge=1, le=AUTOCOMPLETE_MAX)):
+    # ค้นใน memory บน event loop ตรง ๆ ไปที่ executor เฉพาะตอนต้อง build ใหม่
+    index = await autocomplete_index.current()
+    body = dump_json({"prefix": prefix, "games": index.lookup(prefix, limit)})
+    return await json_response("autocomplete", request, body)
+
+# ---------------- full-text search ----------------
+def fts_query(q: str) -> str:
+    """แปลงคำค้นของผู้ใช้เป็น FTS5 query: ทุกคำต้องเจอ (AND), คำสุดท้ายจับแบบ prefix"""
+    terms = ['"' + t.replace('"', '""') + '"' for t in q.split()]
+    if not terms:
+        raise HTTPException(400, "Empty query")
+    terms[-1] += "*"
+    return " ".join(terms)
+
+@app.get("/search")
+@cached("search")
+def search(q: str = Query(..., min_length=1, max_length=200),
+           limit: int = Query(20, ge=1, le=100),
+           cursor: str | None = None):
+    match = fts_query(q)
+    # bm25: ยิ่งน้อยยิ่งตรง น้ำหนัก title > alternate_names > description
+    where, params = "", [match]
+    if cursor:
+        score, last_id = decode_cursor(cursor)
+        where, params = "WHERE (score, id) > (?, ?)", [match, score, last_id]
+
+    with get_db() as con:
+        cur = con.cursor()
+        cur.execute(f"""
+            SELECT id, score FROM (
+                SELECT rowid AS id, bm25(games_fts, 10.0, 5.0, 1.0) AS score
+                FROM games_fts
+                WHERE games_fts MATCH ?
+            )
+            {where}
+            ORDER BY score, id
+            LIMIT ?
+        """, (*params, limit))
+        page = cur.fetchall()
+
+        # snippet เฉพาะแถวในหน้านี้ (ไม่ต้องสร้างให้ทุกแถวที่ match)
+        cur.execute("""
+            SELECT g.id, g.title, g.detail_url, g.primary_image, g.average_rating,
+                   snippet(games_fts, -1, '<b>', '</b>', '…', 16) AS snippet
+            FROM games_fts
+            JOIN games g ON g.id = games_fts.rowid
+            WHERE games_fts MATCH ? AND games_fts.rowid IN (SELECT value FROM json_each(?))
+        """, (match, json.dumps([r["id"] for r in page])))
+        found = {r["id"]: dict(r) for r in cur.fetchall()}
+
+    rows = [dict(found[r["id"]], score=r["score"]) for r in page]
+    return {"q": q, "limit": limit, "games": rows, "next_cursor": next_cursor(rows, limit, "score")}
+
+# ---------------- bulk export ----------------
+EXPORT_CSV_COLUMNS = ["id", "detail_url", "title", "players_min", "players_max", "time_min", "time_max",
+                      "age_plus", "weight_5", "average_rating", "description", "og_image", "primary_image",
+                      "year", *DETAIL_LISTS]
+
+def ndjson_rows(rows) -> bytes:
+    return b"".join(dump_json(detail_from_row(r)) + b"\n" for r in rows)
+
+def csv_rows(rows) -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for r in rows:
+        d = detail_from_row(r)
+        # รายการลูกเก็บแบบคั่นด้วย | เหมือน CSV ต้นทางของ import_bgg_details.py
+        w.writerow(["|".join(d[c]) if c in DETAIL_LISTS else d[c] for c in EXPORT_CSV_COLUMNS])
+    return buf.getvalue().encode("utf-8")
+
+def export_response(request: Request, media_type: str, filename: str, header: bytes, encode):
+    """สตรีมทั้งแคตตาล็อกจาก cursor เดียว ทีละ fetchmany (หน่วยความจำคงที่) บีบ gzip ถ้า client รับได้"""
+    # สตรีมได้เฉพาะ gzip (zlib compressobj) ใช้กติกา q เดียวกับ route JSON
+    use_gzip = negotiate_encoding(request.headers.get("accept-encoding", ""), ("gzip",)) == "gzip"
+
+    async def stream():
+        con = await db_executor.run(pool.open)
+        zip_ = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        try:
+            cur = await db_executor.run(con.execute, f"SELECT {GAME_DETAIL_COLUMNS} FROM games g ORDER BY g.id")
+
+            def next_chunk():
+                rows = cur.fetchmany(EXPORT_BATCH_ROWS)
+                if not rows:
+                    return None
+                data = encode(rows)
+                return zip_.compress(data) if zip_ else data
+
+            data = zip_.compress(header) if zip_ else header
+            while data is not None:
+                if data:
+                    yield data
+                data = await db_executor.run(next_chunk)
+            if zip_:
+                yield zip_.flush()
+        finally:
+            con.close()
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(stream(), media_type=media_type, headers=headers)
+
+@app.get("/export/games.ndjson")
+async def export_ndjson(request: Request):
+    return export_response(request, "application/x-ndjson", "games.ndjson", b"", ndjson_rows)
+
+@app.get("/export/games.csv")
+async def export_csv(request: Request):
+    buf = io.StringIO()
+    csv.writer(buf).writerow(EXPORT_CSV_COLUMNS)
+    return export_response(request, "text/csv; charset=utf-8", "games.csv",
+                           buf.getvalue().encode("utf-8"), csv_rows)
+
+# ---------------- Prometheus exposition ----------------
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _histogram_lines(name: str, label: str, series: dict[str, Histogram]) -> list[str]:
+    lines = [f"# TYPE {name} histogram"]
+    for value, h in series.items():
+        lbl = f'{label}="{_label(value)}"'
+        cumulative = 0
+        for bound, n in zip((*h.buckets, "+Inf"), h.counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{lbl},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{lbl}}} {h.sum}")
+        lines.append(f"{name}_count{{{lbl}}} {h.count}")
+    return lines
+
+def render_metrics() -> str:
+    lines = []
+    with metrics._lock:
+        lines.append("# TYPE bgg_http_requests_total counter")
+        for (method, route, status), n in metrics.requests.items():
+            lines.append(f'bgg_http_requests_total{{method="{method}",route="{_label(route)}",status="{status}"}} {n}')
+        lines += _histogram_lines("bgg_http_request_duration_seconds", "route", metrics.latency)
+        lines.append("# TYPE bgg_http_requests_in_flight gauge")
+        lines.append(f"bgg_http_requests_in_flight {metrics.in_flight}")
+        lines += _histogram_lines("bgg_sql_duration_seconds", "statement", metrics.sql_time)
+        lines.append("# TYPE bgg_sql_rows_returned_total counter")
+        for statement, n in metrics.sql_rows.items():
+            lines.append(f'bgg_sql_rows_returned_total{{statement="{_label(statement)}"}} {n}')
+
+    cache = response_cache.stats()
+    for key, kind in [("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                      ("entries", "gauge"), ("bytes", "gauge")]:
+        suffix = "_total" if kind == "counter" else ""
+        lines.append(f"# TYPE bgg_cache_{key}{suffix} {kind}")
+        lines.append(f"bgg_cache_{key}{suffix} {cache[key]}")
+    lines.append("# TYPE bgg_cache_hit_ratio gauge")
+    lines.append(f"bgg_cache_hit_ratio {cache['hit_ratio'] or 0}")
+
+    lines.append("# TYPE bgg_process_resident_memory_bytes gauge")
+    lines.append(f"bgg_process_resident_memory_bytes {resident_memory_bytes()}")
+    snapshot = _snapshot
+    if snapshot is not None:
+        for key, value in [("generation", snapshot.generation), ("load_seconds", snapshot.load_seconds),
+                           ("database_bytes", snapshot.bytes)]:
+            lines.append(f"# TYPE bgg_snapshot_{key} gauge")
+            lines.append(f"bgg_snapshot_{key} {value}")
+
+    db = db_executor.stats()
+    for key in ("running", "queue_depth"):
+        lines.append(f"# TYPE bgg_db_{key} gauge")
+        lines.append(f"bgg_db_{key} {db[key]}")
+    for key in ("completed", "rejected", "timeouts"):
+        lines.append(f"# TYPE bgg_db_{key}_total counter")
+        lines.append(f"bgg_db_{key}_total {db[key]}")
+    return "\n".join(lines) + "\n"
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(404, "Metrics disabled (set BGG_METRICS=1)")
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
+@app.get("/cache/compression")
+async def cache_compression():
+    return compression_stats.stats()
+
+@app.get("/db/stats")
+async def db_stats():
+    return db_executor.stats()
+
+@app.get("/db/snapshot")
+async def db_snapshot():
+    snapshot = _snapshot
+    return {"enabled": SNAPSHOT_ENABLED, "rss_bytes": resident_memory_bytes(),
+            "snapshot": snapshot.stats() if snapshot else None}
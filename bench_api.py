@@ -0,0 +1,283 @@
+# bench_api.py
+# -*- coding: utf-8 -*-
+"""
+load test ทุก route ของ app/api_bgg.py ด้วย client พร้อมกันหลายตัว แล้วเขียนผลเป็น JSON
+(requests, errors, req/s, p50/p95/p99 ต่อ route) ไว้เทียบระหว่าง commit
+
+สร้างข้อมูลก่อนด้วย gen_synthetic_db.py แล้ว:
+    # in-process: เรียก ASGI app ตรง ๆ (ไม่มี network) ใช้ DB ในโฟลเดอร์ --data
+    python bench_api.py --data bench_data/100k --concurrency 16 --duration 10 --out results.json
+    # หรือยิง uvicorn ที่รันอยู่ (ต้องเปิดจากโฟลเดอร์ --data เดียวกัน)
+    python bench_api.py --data bench_data/100k --url http://127.0.0.1:8000
+
+--no-cache ปิด response cache (วัดเส้นทาง SQL จริง), --routes เลือกเฉพาะบาง route
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import quote, unquote, urlsplit
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "app"))
+
+
+# ---------------- ข้อมูลตัวอย่างสำหรับสุ่มพารามิเตอร์ ----------------
+class Samples:
+    """สุ่ม id / หมวด / ชื่อ / คำค้นจาก DB ที่จะถูกวัด (ให้ทุก request เจอข้อมูลจริง)"""
+
+    def __init__(self, data_dir: Path, size: int = 2000):
+        unified = data_dir / "bgg.db"
+        if unified.exists():
+            # ฐานข้อมูลรวม: แถวของ /games อยู่ในตาราง listings
+            base = details = sqlite3.connect(unified)
+            listing_table = "listings"
+        else:
+            base = sqlite3.connect(data_dir / "bgg_new.db")
+            details = sqlite3.connect(data_dir / "bgg_details.db")
+            listing_table = "games"
+        self.games = details.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+        self.ids = [r[0] for r in details.execute(
+            "SELECT id FROM games ORDER BY random() LIMIT ?", (size,))]
+        self.titles = details.execute(
+            "SELECT title, id FROM games ORDER BY random() LIMIT ?", (size,)).fetchall()
+        self.names = base.execute(
+            f"SELECT name, id FROM {listing_table} ORDER BY random() LIMIT ?", (size,)).fetchall()
+        self.categories = [r[0] for r in details.execute(
+            "SELECT category FROM category_stats ORDER BY games DESC")]
+        self.entities = {entity: [r[0] for r in details.execute(
+            f"SELECT id FROM {entity} ORDER BY random() LIMIT ?", (size,))]
+            for entity in ("designers", "artists", "publishers")}
+        self.similar = details.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'game_neighbors'").fetchone() is not None
+        self.words = sorted({w.lower() for t, _ in self.titles for w in t.split()
+                             if len(w) > 3 and w.isalpha()}) or ["game"]
+        base.close()
+        details.close()
+
+
+def route_table(s: Samples, encode_cursor):
+    """ชื่อ route -> ฟังก์ชันสร้าง path+query (รับ random.Random)"""
+    # หมวดที่มี "/" (เช่น "Action / Dexterity") เรียกผ่าน path parameter ไม่ได้ จึงไม่สุ่มมา
+    path_categories = [c for c in s.categories if "/" not in c][:20]
+
+    def cat(rnd):
+        return quote(rnd.choice(path_categories), safe="")
+
+    def ids(rnd, n):
+        return ",".join(str(i) for i in rnd.sample(s.ids, min(n, len(s.ids))))
+
+    routes = {
+        "games_page":          lambda r: f"/games?limit=20&page={r.randint(1, max(1, s.games // 20))}",
+        "games_cursor":        lambda r: "/games?limit=20&cursor=" + encode_cursor(*r.choice(s.names)),
+        "categories":          lambda r: "/categories",
+        "categories_counts":   lambda r: "/categories?counts=true",
+        "category_games_page": lambda r: f"/categories/{cat(r)}/games?limit=20&page={r.randint(1, 50)}",
+        "category_games_cursor": lambda r: (f"/categories/{cat(r)}/games?limit=20&cursor="
+                                            + encode_cursor(*r.choice(s.titles))),
+        "category_stats":      lambda r: f"/categories/{cat(r)}/stats",
+        "categories_stats":    lambda r: "/categories/stats",
+        "category_top":        lambda r: (f"/categories/{cat(r)}/top"
+                                          f"?by={r.choice(['average_rating', 'weight_5', 'year'])}"),
+        "game_detail":         lambda r: f"/games/{r.choice(s.ids)}",
+        "similar":             lambda r: f"/games/{r.choice(s.ids)}/similar",
+        "games_batch":         lambda r: f"/games/batch?ids={ids(r, 20)}",
+        "filter":              lambda r: (f"/games/filter?players={r.randint(1, 6)}"
+                                          f"&time_max={r.choice([30, 60, 120])}"
+                                          f"&weight_min={r.choice([1, 2, 3])}&limit=20"),
+        "filter_category":     lambda r: f"/games/filter?category={cat(r)}&rating_min=6&limit=20",
+        "search":              lambda r: f"/search?q={quote(r.choice(s.words))}&limit=20",
+        "random":              lambda r: f"/games/random?category={cat(r)}&players={r.randint(1, 6)}&limit=10",
+        "designer":            lambda r: f"/designers/{r.choice(s.entities['designers'])}?limit=20",
+        "artist":              lambda r: f"/artists/{r.choice(s.entities['artists'])}?limit=20",
+        "publisher":           lambda r: f"/publishers/{r.choice(s.entities['publishers'])}?limit=20",
+        "autocomplete":        lambda r: f"/autocomplete?prefix={quote(r.choice(s.titles)[0][:r.randint(1, 6)])}",
+    }
+    if not s.similar:
+        # ยังไม่ได้รัน build_similarity.py (gen_synthetic_db.py ไม่ได้ใส่ --similarity): ทุกคำขอจะได้ 503
+        del routes["similar"]
+    return routes
+
+
+def percentile(samples: list[float], q: float):
+    if not samples:
+        return None
+    s = sorted(samples)
+    return round(s[min(len(s) - 1, int(round(q / 100 * (len(s) - 1))))], 3)
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    n = len(latencies) + errors
+    return {"requests": n, "errors": errors, "rps": round(n / elapsed, 1) if elapsed else None,
+            "p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99)}
+
+
+# ---------------- in-process (ASGI ตรง) ----------------
+async def asgi_get(app, target: str) -> int:
+    path, _, query = target.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "server": ("bench", 80), "client": ("127.0.0.1", 0), "root_path": "",
+        "path": unquote(path), "raw_path": path.encode("ascii"), "query_string": query.encode("ascii"),
+        "headers": [(b"host", b"bench"), (b"accept-encoding", b"identity")],
+    }
+    sent = False
+    status = 0
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run_inprocess(app, make_path, concurrency: int, duration: float, seed: int) -> dict:
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client(i):
+        nonlocal errors
+        rnd = random.Random(seed * 1000 + i)
+        while time.perf_counter() < deadline:
+            target = make_path(rnd)
+            t0 = time.perf_counter()
+            status = await asgi_get(app, target)
+            if status == 200:
+                latencies.append((time.perf_counter() - t0) * 1000)
+            else:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - t0)
+
+
+# ---------------- remote (uvicorn ที่รันอยู่) ----------------
+def run_remote(url: str, make_path, concurrency: int, duration: float, seed: int) -> dict:
+    parts = urlsplit(url)
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+    deadline = time.perf_counter() + duration
+
+    def client(i):
+        rnd = random.Random(seed * 1000 + i)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            target = parts.path.rstrip("/") + make_path(rnd)
+            t0 = time.perf_counter()
+            try:
+                conn.request("GET", target, headers={"Accept-Encoding": "identity"})
+                resp = conn.getresponse()
+                resp.read()
+                ok = resp.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+                ok = False
+            if ok:
+                local.append((time.perf_counter() - t0) * 1000)
+            else:
+                failed += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, errors[0], time.perf_counter() - t0)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", default=".", help="โฟลเดอร์ที่มี bgg_new.db และ bgg_details.db")
+    ap.add_argument("--url", help="ยิง server ที่รันอยู่แทน in-process เช่น http://127.0.0.1:8000")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=5.0, help="วินาทีต่อ route")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--routes", help="เฉพาะบาง route คั่นด้วย comma")
+    ap.add_argument("--no-cache", action="store_true", help="ปิด response cache (in-process เท่านั้น)")
+    ap.add_argument("--out", help="เขียนผล JSON ลงไฟล์ (ไม่ใส่ = พิมพ์ออก stdout)")
+    args = ap.parse_args()
+
+    data_dir = Path(args.data).resolve()
+    out = Path(args.out).resolve() if args.out else None
+    samples = Samples(data_dir)
+    # api_bgg เปิด DB ด้วย path สัมพัทธ์ จึงต้อง chdir ก่อน import
+    os.chdir(data_dir)
+    import api_bgg
+
+    routes = route_table(samples, api_bgg.encode_cursor)
+    if args.routes:
+        names = [k.strip() for k in args.routes.split(",") if k.strip()]
+        unknown = [k for k in names if k not in routes]
+        if unknown:
+            # similar หายจากรายการเมื่อ DB ไม่มี game_neighbors (gen_synthetic_db.py --similarity)
+            ap.error(f"unknown route(s): {', '.join(unknown)} (valid: {', '.join(routes)})")
+        routes = {k: routes[k] for k in names}
+    if args.no_cache:
+        api_bgg.response_cache.max_bytes = 0
+
+    results = {}
+    if args.url:
+        for name, make_path in routes.items():
+            results[name] = run_remote(args.url, make_path, args.concurrency, args.duration, args.seed)
+            print(f"{name:24s} {json.dumps(results[name])}", file=sys.stderr)
+    else:
+        async def run_all():
+            async with api_bgg.app.router.lifespan_context(api_bgg.app):
+                for name, make_path in routes.items():
+                    results[name] = await run_inprocess(api_bgg.app, make_path, args.concurrency,
+                                                        args.duration, args.seed)
+                    print(f"{name:24s} {json.dumps(results[name])}", file=sys.stderr)
+        asyncio.run(run_all())
+
+    report = {
+        "meta": {"commit": git_commit(), "mode": args.url or "in-process", "data": str(data_dir),
+                 "games": samples.games, "concurrency": args.concurrency, "duration_s": args.duration,
+                 "response_cache": not args.no_cache, "python": platform.python_version(),
+                 "sqlite": sqlite3.sqlite_version, "timestamp": int(time.time())},
+        "routes": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if out:
+        out.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
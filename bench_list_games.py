@@ -0,0 +1,96 @@
+# bench_list_games.py
+# -*- coding: utf-8 -*-
+"""
+วัด latency ของ /games (limit=100) เทียบแบบเดิม (N+1: ยิง rating ทีละแถว)
+กับแบบใหม่ (ATTACH bgg_new.db แล้ว LEFT JOIN ในคิวรีเดียว)
+
+รันจากโฟลเดอร์ที่มี bgg_new.db และ bgg_details.db:
+    python bench_list_games.py [--rounds 300] [--limit 100]
+ผลลัพธ์: p50 / p99 (ms) ของแต่ละแบบ
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+import api_bgg  # noqa: E402
+
+
+def legacy_list_games(page: int, limit: int):
+    """โค้ด list_games ก่อนแก้ (ไว้เทียบเท่านั้น)"""
+    offset = (page - 1) * limit
+    con1 = sqlite3.connect(api_bgg.DB_BASE)
+    con1.row_factory = sqlite3.Row
+    cur1 = con1.cursor()
+    cur1.execute("SELECT COUNT(*) FROM games")
+    total = cur1.fetchone()[0]
+    cur1.execute("""
+        SELECT id, category, name, year, url, image_url
+        FROM games
+        ORDER BY name
+        LIMIT ? OFFSET ?
+    """, (limit, offset))
+    rows = [dict(r) for r in cur1.fetchall()]
+    con1.close()
+
+    con2 = sqlite3.connect(api_bgg.DB_DETAILS)
+    con2.row_factory = sqlite3.Row
+    cur2 = con2.cursor()
+    for r in rows:
+        cur2.execute("SELECT average_rating FROM games WHERE detail_url=?", (r["url"],))
+        detail = cur2.fetchone()
+        r["average_rating"] = detail["average_rating"] if detail else None
+    con2.close()
+    return {"page": page, "limit": limit, "total": total, "games": rows}
+
+
+# ตัว endpoint ถูกห่อด้วย cache/executor เรียกฟังก์ชันข้างในตรง ๆ เพื่อวัดเฉพาะ SQL
+joined_list_games = api_bgg.list_games.__wrapped__
+
+
+def percentile(samples, q):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(q / 100 * (len(s) - 1))))]
+
+
+def bench(fn, pages, limit):
+    times = []
+    for page in pages:
+        t0 = time.perf_counter()
+        fn(page=page, limit=limit)
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=300)
+    ap.add_argument("--limit", type=int, default=100)
+    args = ap.parse_args()
+
+    con = sqlite3.connect(api_bgg.DB_BASE)
+    total = con.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+    con.close()
+    last_page = max(1, (total + args.limit - 1) // args.limit)
+
+    rnd = random.Random(42)
+    pages = [rnd.randint(1, last_page) for _ in range(args.rounds)]
+
+    # warm-up ให้ page cache ของ OS เท่ากันทั้งสองแบบ
+    bench(legacy_list_games, pages[:10], args.limit)
+    bench(joined_list_games, pages[:10], args.limit)
+
+    print(f"rows={total} limit={args.limit} rounds={args.rounds}")
+    for label, fn in [("before (N+1)", legacy_list_games), ("after (join)", joined_list_games)]:
+        t = bench(fn, pages, args.limit)
+        print(f"{label:14s} p50={percentile(t, 50):7.2f} ms  p99={percentile(t, 99):7.2f} ms  "
+              f"mean={statistics.mean(t):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench_serialization.py
+# -*- coding: utf-8 -*-
+"""
+วัดเวลา serialize JSON ต่อ route: ทางเดิมของ FastAPI (jsonable_encoder + json.dumps)
+เทียบกับ dump_json ของ api_bgg (ใช้ orjson ถ้าติดตั้งไว้, รับ sqlite3.Row ได้ตรง ๆ)
+
+รันจากโฟลเดอร์ที่มี bgg_new.db และ bgg_details.db:
+    python bench_serialization.py [--rounds 200]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "app"))
+import api_bgg  # noqa: E402
+
+
+def fastapi_default(data) -> bytes:
+    """เหมือนที่ FastAPI ทำเมื่อ endpoint คืน dict ธรรมดา"""
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def payloads():
+    """payload ของแต่ละ route (เรียกฟังก์ชันข้างใน ไม่ผ่าน cache/executor)"""
+    with api_bgg.get_db() as con:
+        category = con.execute("SELECT category FROM category_stats ORDER BY games DESC").fetchone()[0]
+        ids = [r[0] for r in con.execute("SELECT id FROM games ORDER BY id LIMIT 100")]
+    return {
+        "/games?limit=100": api_bgg.list_games.__wrapped__(page=1, limit=100, cursor=None),
+        "/categories": api_bgg.list_categories.__wrapped__(counts=False),
+        "/categories?counts=true": api_bgg.list_categories.__wrapped__(counts=True),
+        "/categories/{c}/games?limit=100": api_bgg.games_by_category.__wrapped__(
+            category=category, page=1, limit=100, cursor=None),
+        "/games/{id}": api_bgg.game_detail.__wrapped__(game_id=ids[0]),
+        "/games/batch (100 ids)": api_bgg.fetch_games_batch(ids),
+        "/games/filter?limit=100": api_bgg.filter_games.__wrapped__(
+            category=None, players=None, time_max=None, age=None, weight_min=None,
+            weight_max=None, rating_min=None, page=1, limit=100),
+    }
+
+
+def timeit(fn, data, rounds):
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn(data)
+        times.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    print(f"dump_json backend: {'orjson' if api_bgg.orjson else 'json (stdlib)'}")
+    print(f"{'route':34s} {'bytes':>9s} {'default µs':>11s} {'fast µs':>9s} {'speedup':>8s}")
+    for route, data in payloads().items():
+        size = len(api_bgg.dump_json(data))
+        slow = timeit(fastapi_default, data, args.rounds)
+        fast = timeit(api_bgg.dump_json, data, args.rounds)
+        print(f"{route:34s} {size:9d} {slow:11.1f} {fast:9.1f} {slow / fast:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
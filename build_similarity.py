@@ -0,0 +1,154 @@
+# build_similarity.py
+# -*- coding: utf-8 -*-
+"""
+สร้างตาราง game_neighbors (top-k เกมที่คล้ายกัน) ให้ /games/{id}/similar อ่านอย่างเดียว
+รันหลัง import (หลัง migrate_add_categories.py หรือ import_unified.py):
+    python build_similarity.py [--db bgg_details.db] [--k 20]
+
+1) feature matrix ต่อเกม (float32, เขียนลงไฟล์ .npy ด้วย memmap ไม่ต้องอยู่ใน RAM ทั้งก้อน)
+   - หมวด: one-hot
+   - designers / publishers: feature hashing ของ entity id ลงจำนวน bucket คงที่
+   - ตัวเลข: players_min, players_max, log(time_max), weight_5 (z-score, ค่าว่าง = ค่าเฉลี่ย)
+   แต่ละกลุ่ม normalize แยกแล้วคูณน้ำหนัก -> cosine = ผลรวมถ่วงน้ำหนักของความคล้ายแต่ละกลุ่ม
+2) cosine similarity แบบ vectorized ทีละบล็อกแถว (X[block] @ X.T) เก็บ k อันดับแรกของแต่ละเกม
+"""
+
+import argparse
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+import import_bgg_details
+import import_unified
+
+K = 20
+DESIGNER_BUCKETS = 128
+PUBLISHER_BUCKETS = 64
+BLOCK_CELLS = 1 << 25          # ขนาดเมทริกซ์ similarity ต่อบล็อก (แถว x เกมทั้งหมด)
+NORMALIZE_ROWS = 65_536
+
+# น้ำหนักของแต่ละกลุ่ม feature (รวมกัน = 1)
+WEIGHTS = {"categories": 0.45, "designers": 0.2, "publishers": 0.1, "numeric": 0.25}
+
+NEIGHBORS_SQL = """
+CREATE TABLE IF NOT EXISTS game_neighbors (
+  game_id      INTEGER NOT NULL,
+  rank         INTEGER NOT NULL,
+  neighbor_id  INTEGER NOT NULL,
+  score        REAL    NOT NULL,
+  PRIMARY KEY (game_id, rank)
+) WITHOUT ROWID;
+"""
+
+def bucket(entity_id: int, buckets: int) -> int:
+    return zlib.crc32(entity_id.to_bytes(8, "little")) % buckets
+
+def normalize_rows(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return m / norms
+
+def build_features(con: sqlite3.Connection, path: Path) -> np.ndarray:
+    """เขียน feature matrix ลง path (.npy) คืน games.id ตามลำดับแถว"""
+    ids = np.array([r[0] for r in con.execute("SELECT id FROM games ORDER BY id")], dtype=np.int64)
+    row_of = {int(g): i for i, g in enumerate(ids)}
+    categories = [r[0] for r in con.execute("SELECT DISTINCT category FROM game_categories ORDER BY category")]
+    col_of = {c: i for i, c in enumerate(categories)}
+    n = len(ids)
+
+    # กลุ่ม -> (sql, จำนวนคอลัมน์, ฟังก์ชันค่า -> คอลัมน์)
+    groups = {
+        "categories": ("SELECT game_id, category FROM game_categories", len(categories), col_of.__getitem__),
+        "designers":  ("SELECT game_id, designer_id FROM game_designers", DESIGNER_BUCKETS,
+                       lambda v: bucket(v, DESIGNER_BUCKETS)),
+        "publishers": ("SELECT game_id, publisher_id FROM game_publishers", PUBLISHER_BUCKETS,
+                       lambda v: bucket(v, PUBLISHER_BUCKETS)),
+        "numeric":    (None, 4, None),
+    }
+    spans, col = {}, 0
+    for name, (_, width, _) in groups.items():
+        spans[name] = (col, col + width)
+        col += width
+
+    features = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, col))
+    for name, (sql, _, column) in groups.items():
+        if sql is None:
+            continue
+        start = spans[name][0]
+        cells = [(row_of[game_id], start + column(value)) for game_id, value in con.execute(sql)
+                 if game_id in row_of]
+        if cells:
+            rows, cols = np.array(cells, dtype=np.int64).T
+            features[rows, cols] = 1
+
+    numeric = np.array(con.execute(
+        "SELECT players_min, players_max, time_max, weight_5 FROM games ORDER BY id"
+    ).fetchall(), dtype=np.float64)          # None -> nan
+    numeric[:, 2] = np.log1p(numeric[:, 2])
+    mean = np.nanmean(numeric, axis=0)
+    std = np.nanstd(numeric, axis=0)
+    std[~(std > 0)] = 1
+    a, b = spans["numeric"]
+    features[:, a:b] = np.nan_to_num((numeric - mean) / std, nan=0.0)
+
+    # normalize แต่ละกลุ่มแยกกันแล้วคูณ sqrt(น้ำหนัก) ทีละช่วงแถว
+    for lo in range(0, n, NORMALIZE_ROWS):
+        chunk = features[lo:lo + NORMALIZE_ROWS]
+        for name, (a, b) in spans.items():
+            chunk[:, a:b] = normalize_rows(chunk[:, a:b]) * np.float32(np.sqrt(WEIGHTS[name]))
+    features.flush()
+    np.save(path.with_suffix(".ids.npy"), ids)
+    return ids
+
+def top_k(features: np.ndarray, ids: np.ndarray, k: int):
+    """yield (แถวเริ่ม, neighbor index [rows, k], score [rows, k]) ทีละบล็อก"""
+    n = len(ids)
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    block = max(1, BLOCK_CELLS // n)
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        sims = features[start:stop] @ features.T                    # cosine (แถว normalize แล้ว)
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf   # ไม่นับตัวเอง
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(sims, part, axis=1)
+        # เรียงในกลุ่ม k: score มากก่อน เสมอกันเอา id น้อยก่อน
+        order = np.lexsort((ids[part], -scores), axis=1)
+        yield start, np.take_along_axis(part, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+def build(db_path: str, k: int):
+    t0 = time.perf_counter()
+    con = sqlite3.connect(db_path)
+    feature_path = Path(db_path).with_suffix(".features.npy")
+    ids = build_features(con, feature_path)
+    features = np.load(feature_path, mmap_mode="r")
+    print(f"features: {features.shape[0]:,d} games x {features.shape[1]} dims -> {feature_path} "
+          f"({time.perf_counter() - t0:.1f}s)")
+
+    cur = con.cursor()
+    cur.executescript(NEIGHBORS_SQL)
+    cur.execute("DELETE FROM game_neighbors")
+    for start, neighbors, scores in top_k(features, ids, k):
+        rows = [(int(ids[start + i]), rank + 1, int(ids[j]), round(float(s), 6))
+                for i in range(len(neighbors))
+                for rank, (j, s) in enumerate(zip(neighbors[i], scores[i]))]
+        cur.executemany("INSERT INTO game_neighbors (game_id, rank, neighbor_id, score) VALUES (?,?,?,?)",
+                        rows)
+    con.commit()
+    con.close()
+    print(f"✅ game_neighbors: top-{k} for {len(ids):,d} games ({time.perf_counter() - t0:.1f}s)")
+
+def main():
+    default_db = import_unified.DB_FILE if Path(import_unified.DB_FILE).exists() else import_bgg_details.DB_FILE
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=default_db)
+    ap.add_argument("--k", type=int, default=K)
+    args = ap.parse_args()
+    build(args.db, args.k)
+
+if __name__ == "__main__":
+    main()
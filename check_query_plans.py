@@ -0,0 +1,200 @@
+# check_query_plans.py
+# -*- coding: utf-8 -*-
+"""
+ตรวจ EXPLAIN QUERY PLAN ของทุก SQL ที่ API ยิงจริง กันคิวรีหล่นไปเป็น full scan เงียบ ๆ เมื่อ schema เปลี่ยน
+(เช่น index ของ detail_url หาย หรือ ORDER BY หลัง join หมวดต้องเรียงด้วย temp B-tree)
+
+1) สร้าง DB สังเคราะห์ด้วย gen_synthetic_db.py ทั้งแบบสองไฟล์และ bgg.db ไฟล์เดียว
+2) เรียกทุก route ผ่าน ASGI ในโปรเซส จับ SQL ที่รันจริงด้วย trace callback ของ connection ในพูล
+3) EXPLAIN QUERY PLAN ทีละ statement: ห้ามมี SCAN ตาราง, USE TEMP B-TREE หรือ AUTOMATIC INDEX
+   ยกเว้นที่ระบุไว้ใน ALLOWED (พร้อมเหตุผล) และ SCAN ... USING INDEX ที่เป็นตัวขับ ORDER BY ... LIMIT
+   ของตารางนั้นเองใน SELECT เดียวกัน
+
+    python check_query_plans.py [--games 3000] [--keep DIR] [-v]
+exit code 1 เมื่อมี plan ที่ไม่ผ่าน
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+# (regex ของ shape(SQL), regex ของบรรทัด plan ที่ยอมให้มี, เหตุผล)
+ALLOWED = [
+    (r"FROM sqlite_master", r"^SCAN sqlite_master$", "เช็คว่ามีตาราง: sqlite_master เล็กมาก"),
+    (r"FROM category_stats", r"^SCAN category_stats$", "ตารางสรุป 1 แถวต่อหมวด เรียงตาม PK อยู่แล้ว"),
+    (r"FROM (base\.)?category_counts", r"^SCAN (base\.)?category_counts$", "ตารางสรุป 1 แถวต่อหมวด"),
+    (r"MATCH", r"^SCAN games_fts VIRTUAL TABLE INDEX", "FTS5 MATCH (ใช้ full-text index)"),
+    (r"json_each", r"^SCAN json_each VIRTUAL TABLE INDEX", "รายการ id ที่ส่งมาเอง"),
+    (r"MATCH", r"^USE TEMP B-TREE FOR ORDER BY$", "เรียงตาม bm25 ได้จากผล MATCH เท่านั้น"),
+    (r"^\s*WITH f AS MATERIALIZED", r"^USE TEMP B-TREE FOR (GROUP BY|ORDER BY)$",
+     "facet / เรียงหน้าเฉพาะแถวที่ผ่านตัวกรองใน CTE"),
+    (r"ORDER BY name, id\s+LIMIT \S+ OFFSET \S+\s+\) \w+\s+(LEFT )?JOIN games",
+     r"^USE TEMP B-TREE FOR ORDER BY$", "list_games: เรียงซ้ำเฉพาะแถวของหน้า (<= limit) หลัง join"),
+    (r"WHERE g\.id IN \( ?SELECT game_id FROM game_(designers|artists|publishers) WHERE",
+     r"^USE TEMP B-TREE FOR ORDER BY$", "หน้าของ designer / artist / publisher: เรียงเฉพาะเกมของ entity นั้น"),
+    # สร้าง index ใน memory ต่อเวอร์ชัน อ่านทั้งตารางโดยตั้งใจ
+    (r"^\s*SELECT id, title, average_rating FROM games ORDER BY", r"^(SCAN games|USE TEMP B-TREE FOR ORDER BY)$",
+     "build AutocompleteIndex"),
+    (r"^\s*SELECT game_id, name FROM alternate_names$", r"^SCAN alternate_names$", "build AutocompleteIndex"),
+    (r"^\s*SELECT id, players_min, players_max FROM games ORDER BY id$", r"^SCAN games$", "build RandomIndex"),
+    (r"^\s*SELECT game_id, category FROM game_categories ORDER BY category, game_id$",
+     r"^SCAN game_categories USING COVERING INDEX", "build RandomIndex"),
+    (r"^SELECT id, average_rating, weight_5, time_min, time_max, year FROM games ORDER BY id$", r"^SCAN games$",
+     "build CategoryStatsIndex"),
+    (r"^SELECT category, json_group_array\(game_id\) FROM game_categories GROUP BY category$",
+     r"^SCAN game_categories USING COVERING INDEX", "build CategoryStatsIndex"),
+    (r"FROM games g\s+ORDER BY g\.id$", r"^SCAN g$", "export ทั้งแคตตาล็อก (สตรีมตาม PK)"),
+]
+
+SCAN_OR_SORT = re.compile(r"^(SCAN |USE TEMP B-TREE)")
+INDEX_WALK = re.compile(r"^SCAN \S+ USING (COVERING )?INDEX ")
+DERIVED = re.compile(r"^(CO-ROUTINE|MATERIALIZE) (\S+)")
+AUTOMATIC = re.compile(r"\bAUTOMATIC (PARTIAL )?(COVERING )?INDEX\b")
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# statement ภายในของ FTS5 (อ่าน shadow table เอง ไม่ใช่ SQL ของ API)
+FTS_INTERNAL = re.compile(r"FROM '[^']+'\.'games_fts_")
+
+
+def shape(sql: str) -> str:
+    """SQL ที่แทนค่าคงที่ด้วย ? (trace ได้ SQL ที่ใส่ค่าแล้ว) ใช้จัดกลุ่มผล"""
+    return " ".join(LITERAL.sub("?", sql).split())
+
+
+def drives_limit(text: str, name: str) -> bool:
+    """name (ตารางหรือ alias ใน plan) เป็นตารางเดียวของ SELECT ที่ ORDER BY ... LIMIT ตรง ๆ
+    ไม่มี JOIN / subquery คั่นระหว่าง FROM กับ LIMIT การไล่ index จึงหยุดหลังได้ครบ limit แถว"""
+    n = re.escape(name)
+    source = rf"(?:{n}(?: (?:AS )?(?!WHERE\b|ORDER\b)\w+)?|(?:\w+\.)?\w+ (?:AS )?{n})"
+    clause = r"(?:(?!\b(?:FROM|JOIN|SELECT|LIMIT)\b).)*?"
+    return re.search(rf"\bFROM {source} (?:WHERE {clause} )?ORDER BY {clause} LIMIT\b", text) is not None
+
+
+def violations(sql: str, plan: list[str]) -> list[str]:
+    """บรรทัด plan ที่เป็น full scan / temp B-tree / automatic index โดยไม่อยู่ใน ALLOWED"""
+    text = shape(sql)
+    derived = {m.group(2) for m in map(DERIVED.match, plan) if m}
+    bad = []
+    for detail in plan:
+        if AUTOMATIC.search(detail):
+            # SQLite สร้าง index ชั่วคราวทุกครั้งที่รัน = ขาด index จริง (รวมถึงบนผลของ subquery)
+            if not any(re.search(s, text) and re.search(p, detail) for s, p, _ in ALLOWED):
+                bad.append(detail)
+            continue
+        if not SCAN_OR_SORT.match(detail):
+            continue
+        name = detail.split()[1]
+        if name in derived or name == "CONSTANT" or name.startswith("(subquery-"):
+            continue    # อ่านผลของ CTE / subquery ไม่ใช่ตาราง
+        if INDEX_WALK.match(detail) and drives_limit(text, name):
+            continue    # ไล่ index ตามลำดับ ORDER BY แล้วหยุดที่ LIMIT
+        if any(re.search(s, text) and re.search(p, detail) for s, p, _ in ALLOWED):
+            continue
+        bad.append(detail)
+    return bad
+
+
+def requests_for(samples, api_bgg) -> list[str]:
+    """ทุก route ที่อ่านฐานข้อมูล: ใช้ตัวสร้าง path ของ bench_api หลาย ๆ ค่า + กรณีที่สุ่มไม่ครอบคลุม"""
+    import bench_api
+    rnd = random.Random(1)
+    paths = [make(rnd) for make in bench_api.route_table(samples, api_bgg.encode_cursor).values()
+             for _ in range(3)]
+    game_id = samples.ids[0]
+    category = next(c for c in samples.categories if "/" not in c)
+    paths += [
+        "/games/filter?weight_max=3&age=10&rating_min=6&limit=10&page=2",
+        f"/games/filter?category={category}&players=2&time_max=60&weight_min=2&weight_max=4&age=12",
+        f"/categories/{category}/games?limit=5&page=3",
+        f"/search?q={samples.words[0]}&limit=2&cursor=" + api_bgg.encode_cursor(-1.0, game_id),
+        f"/games/{game_id}/similar?limit=5",
+        f"/publishers/{samples.entities['publishers'][0]}?limit=5&page=2",
+        f"/designers/{samples.entities['designers'][0]}?cursor=" + api_bgg.encode_cursor("M", 0),
+        "/games/random?limit=5",
+        "/games/random?players=3&limit=5&seed=1",
+        "/export/games.ndjson",
+        "/export/games.csv",
+    ]
+    return paths
+
+
+def check_layout(data_dir: Path, verbose: bool) -> int:
+    """รันในโปรเซสแยกต่อ layout (api_bgg เลือก layout ตอน import)"""
+    os.chdir(data_dir)
+    sys.path.insert(0, str(ROOT))
+    import bench_api   # noqa: F401  (ใส่ app/ ลง sys.path)
+    import api_bgg
+
+    samples = bench_api.Samples(data_dir)
+    statements = set()
+    open_connection = api_bgg.pool.open
+
+    def traced_open():
+        con = open_connection()
+        con.set_trace_callback(statements.add)
+        return con
+
+    api_bgg.pool.open = traced_open
+    api_bgg.response_cache.max_bytes = 0
+
+    async def drive():
+        for path in requests_for(samples, api_bgg):
+            status = await bench_api.asgi_get(api_bgg.app, path)
+            if status != 200:
+                print(f"  {path} -> HTTP {status}")
+    asyncio.run(drive())
+    api_bgg.pool.open = open_connection
+
+    con = open_connection()
+    by_shape = {}
+    for sql in statements:
+        if re.match(r"\s*(SELECT|WITH)\b", sql, re.I) and not FTS_INTERNAL.search(sql):
+            by_shape.setdefault(shape(sql), sql)
+
+    failed = 0
+    for key, sql in sorted(by_shape.items()):
+        plan = [r["detail"] for r in con.execute("EXPLAIN QUERY PLAN " + sql)]
+        bad = violations(sql, plan)
+        if bad or verbose:
+            print(("FAIL " if bad else "ok   ") + key[:200])
+            for detail in plan:
+                print(f"       {'!!' if detail in bad else '  '} {detail}")
+        failed += bool(bad)
+    con.close()
+    layout = "unified" if api_bgg.UNIFIED else "split"
+    print(f"{layout}: {len(by_shape)} statements, {failed} with unexpected SCAN / temp B-tree / automatic index")
+    return 1 if failed else 0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--games", type=int, default=3000)
+    ap.add_argument("--keep", help="สร้าง DB ไว้ในโฟลเดอร์นี้ (ไม่ลบทิ้ง)")
+    ap.add_argument("-v", "--verbose", action="store_true", help="พิมพ์ plan ทุก statement")
+    ap.add_argument("--check", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.check:
+        sys.exit(check_layout(Path(args.check), args.verbose))
+
+    import gen_synthetic_db
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(args.keep or tmp)
+        status = 0
+        for layout, unified in [("split", False), ("unified", True)]:
+            data_dir = base / layout
+            gen_synthetic_db.generate(args.games, data_dir, seed=1, desc_words=20, unified=unified,
+                                      similarity=True)
+            cmd = [sys.executable, __file__, "--check", str(data_dir)] + (["-v"] if args.verbose else [])
+            status |= subprocess.run(cmd).returncode
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# gen_synthetic_db.py
+# -*- coding: utf-8 -*-
+"""
+สร้าง bgg_new.db + bgg_details.db สังเคราะห์ (schema เดียวกับสคริปต์ import จริง) สำหรับ benchmark
+- ขนาดตามต้องการ เช่น 10k / 100k / 1M เกม
+- ตารางลูกกระจายใกล้ของจริง: gallery 0-12, alternate names 0-3, designers 1-2,
+  artists 0-3, publishers 1-5 (ชื่อซ้ำข้ามเกมแบบ long-tail), 1-3 หมวดต่อเกม
+- ชื่อหมวดเอามาจาก CSV ดัชนีหมวดถ้ามี (85 หมวดจริง)
+- --unified สร้าง bgg.db ไฟล์เดียวแบบ import_unified.py (games.id = BGG id) แทนสองไฟล์
+- --similarity สร้าง game_neighbors ด้วย build_similarity.py ต่อท้าย (top-k แบบ exact O(n²):
+  ~1 วินาทีที่ 5k, ~8 วินาทีที่ 20k เกม ไม่เหมาะกับ 100k+ จึงปิดไว้เป็นค่าเริ่มต้น)
+
+    python gen_synthetic_db.py --games 100000 --out bench_data/100k [--unified]
+    python gen_synthetic_db.py --games 5000 --out bench_data/5k --similarity
+"""
+
+import argparse
+import csv
+import random
+import sqlite3
+import string
+import time
+from pathlib import Path
+
+import build_similarity
+import import_bgg
+import import_bgg_details
+import import_unified
+import migrate_add_categories
+
+BATCH = 10_000
+
+SYLLABLES = ["ka", "ta", "ri", "on", "mar", "zel", "dor", "vin", "lu", "sa", "gen", "tor", "ax", "el",
+             "quin", "bra", "mo", "nes", "pha", "ry", "cas", "til", "dra", "go", "hal", "ix", "jun"]
+WORDS = ["the", "of", "and", "war", "dice", "card", "empire", "trade", "city", "castle", "dragon",
+         "island", "space", "train", "farm", "king", "quest", "legend", "battle", "garden", "ocean",
+         "mystery", "tower", "forest", "star", "race", "gold", "river", "night", "kingdom"]
+
+
+def word(rnd: random.Random) -> str:
+    return "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(1, 3))).capitalize()
+
+
+def title(rnd: random.Random) -> str:
+    t = " ".join(word(rnd) if rnd.random() < 0.6 else rnd.choice(WORDS).capitalize()
+                 for _ in range(rnd.randint(1, 4)))
+    if rnd.random() < 0.2:
+        t += ": " + " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 4))).title()
+    return t
+
+
+def image_url(rnd: random.Random) -> str:
+    token = "".join(rnd.choices(string.ascii_letters + string.digits, k=22))
+    return (f"https://cf.geekdo-images.com/{token}__opengraph/img/{token[:12]}=/0x0:1200x630/"
+            f"fit-in/1200x630/filters:strip_icc()/pic{rnd.randint(1, 9_000_000)}.jpg")
+
+
+def clamp(v, lo, hi):
+    return max(lo, min(hi, v))
+
+
+def people_pool(rnd: random.Random, size: int) -> list[str]:
+    return list(dict.fromkeys(f"{word(rnd)} {word(rnd)}" for _ in range(max(size, 1))))
+
+
+def pick(rnd: random.Random, pool: list[str], skew: float) -> int:
+    # long-tail: ชื่อต้น ๆ ถูกใช้ซ้ำบ่อยกว่ามาก คืน entity id (ตำแหน่งใน pool + 1)
+    return min(len(pool) - 1, int(len(pool) * rnd.random() ** skew)) + 1
+
+
+def load_categories() -> list[str]:
+    path = Path(__file__).resolve().parent / import_bgg.CSV_FILE
+    if path.exists():
+        with open(path, newline="", encoding="utf-8") as f:
+            cats = sorted({r["category"] for r in csv.DictReader(f) if r.get("category")})
+        if cats:
+            return cats
+    return [f"Category {i:02d}" for i in range(85)]
+
+
+def generate(n_games: int, out_dir: Path, seed: int, desc_words: int, unified: bool = False,
+             similarity: bool = False):
+    rnd = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    base_path = out_dir / import_bgg.DB_FILE
+    details_path = out_dir / (import_unified.DB_FILE if unified else import_bgg_details.DB_FILE)
+    for p in (base_path, details_path):
+        for suffix in ("", "-wal", "-shm"):
+            Path(str(p) + suffix).unlink(missing_ok=True)
+
+    categories = load_categories()
+    cat_weights = [1 / (i + 1) ** 0.7 for i in range(len(categories))]
+    designers = people_pool(rnd, n_games // 5)
+    artists = people_pool(rnd, n_games // 4)
+    publishers = list(dict.fromkeys(f"{word(rnd)} Games" for _ in range(max(n_games // 20, 1))))
+    bgg_ids = rnd.sample(range(1, n_games * 8), n_games)
+
+    con = sqlite3.connect(details_path)
+    cur = con.cursor()
+    cur.executescript(import_bgg_details.SCHEMA_SQL)
+    cur.executescript(migrate_add_categories.CATEGORIES_SCHEMA_SQL)
+    migrate_add_categories.ensure_category_titles(cur)
+    cur.execute("PRAGMA foreign_keys = OFF")
+    # entity id = ตำแหน่งใน pool + 1
+    pools = {"designers": designers, "artists": artists, "publishers": publishers}
+    for entity, names in pools.items():
+        cur.executemany(f"INSERT INTO {entity} (id, name) VALUES (?, ?)", enumerate(names, 1))
+
+    if unified:
+        cur.executescript(import_unified.LISTINGS_SCHEMA_SQL)
+        base = con
+        listing_sql = "INSERT INTO listings (game_id, category, name, year, image_url) VALUES (?,?,?,?,?)"
+    else:
+        base = sqlite3.connect(base_path)
+        base.executescript(import_bgg.SCHEMA_SQL)
+        listing_sql = "INSERT INTO games (category, name, year, url, image_url) VALUES (?,?,?,?,?)"
+
+    t0 = time.perf_counter()
+    for start in range(0, n_games, BATCH):
+        games, children, links, fts, cats, listing = [], {k: [] for k in
+            ("gallery_images", "alternate_names")}, {k: [] for k in pools}, [], [], []
+        for n in range(start + 1, min(start + BATCH, n_games) + 1):
+            bgg_id = bgg_ids[n - 1]
+            game_id = bgg_id if unified else n
+            name = title(rnd)
+            url = f"https://boardgamegeek.com/boardgame/{bgg_id}/{name.lower().replace(' ', '-')[:40]}"
+            players_min = rnd.choices([1, 2, 3, 4], [25, 55, 15, 5])[0]
+            time_min = rnd.choice([10, 15, 20, 30, 45, 60, 90, 120])
+            desc = " ".join(rnd.choice(WORDS) for _ in range(desc_words))
+            img = image_url(rnd)
+            year = rnd.randint(1950, 2025)
+            games.append((game_id, url, name, players_min, players_min + rnd.randint(0, 6),
+                          time_min, time_min + rnd.choice([0, 0, 15, 30, 60, 120]),
+                          rnd.choice([6, 8, 10, 12, 14, 16]),
+                          round(clamp(rnd.gauss(2.4, 0.8), 1, 5), 4),
+                          round(clamp(rnd.gauss(6.5, 1.0), 1, 10), 5), desc, img, img, year))
+
+            gallery = [image_url(rnd) for _ in range(rnd.choices(range(13), [20] + [5] * 11 + [25])[0])]
+            alt = [title(rnd) for _ in range(rnd.choices(range(4), [60, 25, 10, 5])[0])]
+            children["gallery_images"] += [(game_id, u) for u in gallery]
+            children["alternate_names"] += [(game_id, a) for a in alt]
+            for entity, skew, lo, hi in (("designers", 2.0, 1, 2), ("artists", 2.0, 0, 3),
+                                         ("publishers", 3.0, 1, 5)):
+                links[entity] += [(game_id, position, pick(rnd, pools[entity], skew))
+                                  for position in range(rnd.randint(lo, hi))]
+            fts.append((game_id, name, "\n".join(alt), desc))
+
+            for cat in set(rnd.choices(categories, cat_weights, k=rnd.randint(1, 3))):
+                cats.append((game_id, cat))
+                listing.append((game_id, cat, name, year, img) if unified else (cat, name, year, url, img))
+
+        cur.executemany("""
+            INSERT INTO games (id, detail_url, title, players_min, players_max, time_min, time_max,
+                               age_plus, weight_5, average_rating, description, og_image, primary_image, year)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, games)
+        for table, rows in children.items():
+            column = "url" if table == "gallery_images" else "name"
+            cur.executemany(f"INSERT INTO {table} (game_id, {column}) VALUES (?, ?)", rows)
+        for entity, rows in links.items():
+            link_table, id_column = import_bgg_details.ENTITY_LINKS[entity]
+            cur.executemany(f"INSERT INTO {link_table} (game_id, position, {id_column}) VALUES (?, ?, ?)", rows)
+        cur.executemany("INSERT INTO games_fts (rowid, title, alternate_names, description) VALUES (?,?,?,?)", fts)
+        cur.executemany("INSERT INTO game_categories (game_id, category) VALUES (?, ?)", cats)
+        base.executemany(listing_sql, listing)
+        print(f"  {min(start + BATCH, n_games):>9,d} / {n_games:,d} games  ({time.perf_counter() - t0:.1f}s)")
+
+    migrate_add_categories.refresh_category_titles(cur)
+    migrate_add_categories.refresh_category_stats(cur)
+    migrate_add_categories.refresh_leaderboards(cur)
+    if unified:
+        import_unified.refresh_category_counts(cur)
+    cur.execute("ANALYZE")
+    con.commit()
+    con.close()
+    if unified:
+        print(f"✅ {n_games:,d} games -> {details_path} ({time.perf_counter() - t0:.1f}s)")
+    else:
+        import_bgg.refresh_category_counts(base.cursor())
+        base.execute("ANALYZE")
+        base.commit()
+        base.close()
+        print(f"✅ {n_games:,d} games -> {details_path}, {base_path} ({time.perf_counter() - t0:.1f}s)")
+    if similarity:
+        build_similarity.build(str(details_path), build_similarity.K)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--games", type=int, default=10_000)
+    ap.add_argument("--out", default="bench_data/10k")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--desc-words", type=int, default=80, help="จำนวนคำใน description ต่อเกม")
+    ap.add_argument("--unified", action="store_true", help="สร้าง bgg.db ไฟล์เดียว (import_unified.py)")
+    ap.add_argument("--similarity", action="store_true",
+                    help="สร้าง game_neighbors (/games/{id}/similar) ด้วย: O(n²) ใช้กับชุดเล็กเท่านั้น")
+    args = ap.parse_args()
+    generate(args.games, Path(args.out), args.seed, args.desc_words, args.unified, args.similarity)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,29 @@ from pathlib import Path
 CSV_FILE = "boardgame_categories_with_images_by_api_regex.csv"
 DB_FILE  = "bgg_new.db"
 
+SCHEMA_SQL = """
+CREATE TABLE games (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    category  TEXT NOT NULL,
+    name      TEXT NOT NULL,
+    year      INTEGER,
+    url       TEXT,
+    image_url TEXT
+);
+CREATE INDEX idx_games_category ON games(category);
+CREATE INDEX idx_games_name ON games(name);
+
+-- จำนวนแถวต่อหมวด (API ใช้เป็น total แทน COUNT(*) ทุกครั้ง)
+CREATE TABLE category_counts (
+    category TEXT PRIMARY KEY,
+    games    INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+def refresh_category_counts(cur):
+    cur.execute("DELETE FROM category_counts")
+    cur.execute("INSERT INTO category_counts SELECT category, COUNT(*) FROM games GROUP BY category")
+
 def import_csv_to_db(csv_file: str, db_file: str):
     # ลบไฟล์ฐานข้อมูลเก่าถ้ามีอยู่
     Path(db_file).unlink(missing_ok=True)
@@ -15,18 +38,7 @@ def import_csv_to_db(csv_file: str, db_file: str):
     cur = con.cursor()
 
     # สร้างตารางใหม่
-    cur.execute("""
-    CREATE TABLE games (
-        id        INTEGER PRIMARY KEY AUTOINCREMENT,
-        category  TEXT NOT NULL,
-        name      TEXT NOT NULL,
-        year      INTEGER,
-        url       TEXT,
-        image_url TEXT
-    );
-    """)
-    cur.execute("CREATE INDEX idx_games_category ON games(category);")
-    cur.execute("CREATE INDEX idx_games_name ON games(name);")
+    cur.executescript(SCHEMA_SQL)
 
     # อ่าน CSV แล้ว insert
     with open(csv_file, newline="", encoding="utf-8") as f:
@@ -34,6 +46,7 @@ def import_csv_to_db(csv_file: str, db_file: str):
         rows = [(r["category"], r["name"], int(r["year"] or 0), r["url"], r["image_url"]) for r in reader]
 
     cur.executemany("INSERT INTO games (category,name,year,url,image_url) VALUES (?,?,?,?,?)", rows)
+    refresh_category_counts(cur)
 
     con.commit()
     con.close()
@@ -1,10 +1,14 @@
 # import_bgg_details.py
 # -*- coding: utf-8 -*-
+import argparse
 import csv
 import sqlite3
 import html
 from pathlib import Path
 
+from migrate_add_categories import (ensure_category_titles, ensure_year_column, refresh_category_stats,
+                                    refresh_category_titles, update_leaderboards)
+
 CSV_FILE = "bgg_details_from_urls_api_regex.csv"
 DB_FILE  = "bgg_details.db"
 
@@ -65,6 +69,56 @@ def get_field(row: dict, logical_key: str, default: str = "") -> str:
     return default
 
 # -------------- schema -------------------
+ENTITY_SCHEMA_SQL = """
+-- designers / artists / publishers: ชื่อเก็บครั้งเดียวต่อ entity (intern) ผูกกับเกมด้วยตาราง link
+-- link: PK (game_id, position) = รายชื่อของเกมตามลำดับใน CSV, index (entity, game_id) = เกมทั้งหมดของ entity
+CREATE TABLE IF NOT EXISTS designers (
+  id    INTEGER PRIMARY KEY,
+  name  TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS artists (
+  id    INTEGER PRIMARY KEY,
+  name  TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS publishers (
+  id    INTEGER PRIMARY KEY,
+  name  TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS game_designers (
+  game_id      INTEGER NOT NULL,
+  position     INTEGER NOT NULL,
+  designer_id  INTEGER NOT NULL,
+  PRIMARY KEY (game_id, position),
+  FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE,
+  FOREIGN KEY (designer_id) REFERENCES designers(id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS game_artists (
+  game_id    INTEGER NOT NULL,
+  position   INTEGER NOT NULL,
+  artist_id  INTEGER NOT NULL,
+  PRIMARY KEY (game_id, position),
+  FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE,
+  FOREIGN KEY (artist_id) REFERENCES artists(id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS game_publishers (
+  game_id       INTEGER NOT NULL,
+  position      INTEGER NOT NULL,
+  publisher_id  INTEGER NOT NULL,
+  PRIMARY KEY (game_id, position),
+  FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE,
+  FOREIGN KEY (publisher_id) REFERENCES publishers(id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_game_designers_designer   ON game_designers(designer_id, game_id);
+CREATE INDEX IF NOT EXISTS idx_game_artists_artist         ON game_artists(artist_id, game_id);
+CREATE INDEX IF NOT EXISTS idx_game_publishers_publisher   ON game_publishers(publisher_id, game_id);
+"""
+
 SCHEMA_SQL = """
 PRAGMA journal_mode = WAL;
 PRAGMA synchronous = NORMAL;
@@ -82,7 +136,8 @@ CREATE TABLE IF NOT EXISTS games (
   average_rating REAL,
   description    TEXT,
   og_image       TEXT,
-  primary_image  TEXT
+  primary_image  TEXT,
+  year           INTEGER  -- จาก CSV ดัชนีหมวด (migrate_add_categories.py / import_unified.py)
 );
 
 CREATE TABLE IF NOT EXISTS gallery_images (
@@ -98,41 +153,28 @@ CREATE TABLE IF NOT EXISTS alternate_names (
   name     TEXT NOT NULL,
   FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
 );
-
-CREATE TABLE IF NOT EXISTS designers (
-  id       INTEGER PRIMARY KEY AUTOINCREMENT,
-  game_id  INTEGER NOT NULL,
-  name     TEXT NOT NULL,
-  FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
-);
-
-CREATE TABLE IF NOT EXISTS artists (
-  id       INTEGER PRIMARY KEY AUTOINCREMENT,
-  game_id  INTEGER NOT NULL,
-  name     TEXT NOT NULL,
-  FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
-);
-
-CREATE TABLE IF NOT EXISTS publishers (
-  id       INTEGER PRIMARY KEY AUTOINCREMENT,
-  game_id  INTEGER NOT NULL,
-  name     TEXT NOT NULL,
-  FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
-);
-
+""" + ENTITY_SCHEMA_SQL + """
 CREATE INDEX IF NOT EXISTS idx_games_title       ON games(title);
 CREATE INDEX IF NOT EXISTS idx_games_players     ON games(players_min, players_max);
+CREATE INDEX IF NOT EXISTS idx_games_time        ON games(time_max, time_min);
+CREATE INDEX IF NOT EXISTS idx_games_weight      ON games(weight_5, average_rating);
+CREATE INDEX IF NOT EXISTS idx_games_rating      ON games(average_rating, weight_5);
+CREATE INDEX IF NOT EXISTS idx_games_age         ON games(age_plus);
 CREATE INDEX IF NOT EXISTS idx_gallery_game      ON gallery_images(game_id);
 CREATE INDEX IF NOT EXISTS idx_alt_names_game    ON alternate_names(game_id);
-CREATE INDEX IF NOT EXISTS idx_designers_game    ON designers(game_id);
-CREATE INDEX IF NOT EXISTS idx_artists_game      ON artists(game_id);
-CREATE INDEX IF NOT EXISTS idx_publishers_game   ON publishers(game_id);
+
+-- ดัชนีค้นหาข้อความ (rowid = games.id) อัปเดตทีละเกมตอน upsert
+CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5(
+  title, alternate_names, description,
+  tokenize = 'unicode61 remove_diacritics 2'
+);
 """
 
+# id = NULL -> AUTOINCREMENT (DB แยก), import_unified.py ส่ง BGG id มาเป็น primary key เอง
 INSERT_GAME_SQL = """
-INSERT INTO games (detail_url, title, players_min, players_max, time_min, time_max,
+INSERT INTO games (id, detail_url, title, players_min, players_max, time_min, time_max,
                    age_plus, weight_5, average_rating, description, og_image, primary_image)
-VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 ON CONFLICT(detail_url) DO UPDATE SET
   title=excluded.title,
   players_min=excluded.players_min,
@@ -148,17 +190,108 @@ ON CONFLICT(detail_url) DO UPDATE SET
 RETURNING id;
 """
 
-def import_details(csv_path: str, db_path: str):
-    # เริ่มฐานข้อมูลใหม่ (ถ้าไม่อยากรีเซ็ตทุกครั้ง ให้คอมเมนต์บรรทัดนี้)
-    Path(db_path).unlink(missing_ok=True)
+# entity -> (ตาราง link, คอลัมน์ id ของ entity)
+ENTITY_LINKS = {
+    "designers":  ("game_designers",  "designer_id"),
+    "artists":    ("game_artists",    "artist_id"),
+    "publishers": ("game_publishers", "publisher_id"),
+}
+
+def intern_entity(cur, entity: str, name: str) -> int:
+    """id ของชื่อใน designers / artists / publishers (สร้างแถวใหม่ถ้ายังไม่มี)"""
+    row = cur.execute(f"SELECT id FROM {entity} WHERE name = ?", (name,)).fetchone()
+    if row:
+        return row[0]
+    cur.execute(f"INSERT INTO {entity} (name) VALUES (?)", (name,))
+    return cur.lastrowid
+
+def prune_entities(cur):
+    """ลบ entity ที่ไม่เหลือเกมผูกอยู่แล้ว (หลัง upsert ทับรายชื่อเดิม)"""
+    for entity, (link_table, id_column) in ENTITY_LINKS.items():
+        cur.execute(f"""
+            DELETE FROM {entity}
+            WHERE NOT EXISTS (SELECT 1 FROM {link_table} l WHERE l.{id_column} = {entity}.id)
+        """)
+
+def upsert_game(cur, r: dict, game_id: int | None = None) -> int:
+    """upsert เกม 1 แถวจาก CSV พร้อมตารางลูกและแถว FTS คืน games.id"""
+    detail_url = get_field(r, "detail_url").strip()
+    title = html.unescape(get_field(r, "title")).strip()
+    desc  = html.unescape(get_field(r, "description"))
+
+    players_min = to_int(get_field(r, "players_min"))
+    players_max = to_int(get_field(r, "players_max"))
+    time_min    = to_int(get_field(r, "time_min"))
+    time_max    = to_int(get_field(r, "time_max"))
+    age_plus    = to_int(get_field(r, "age_plus"))
+    weight_5    = to_float(get_field(r, "weight_5"))
+    avg_rating  = to_float(get_field(r, "average_rating"))
+
+    og_image      = get_field(r, "og_image").strip()
+    primary_image = get_field(r, "primary_image").strip()
+
+    cur.execute(
+        INSERT_GAME_SQL,
+        (game_id, detail_url, title, players_min, players_max, time_min, time_max,
+         age_plus, weight_5, avg_rating, desc, og_image, primary_image)
+    )
+    game_id = cur.fetchone()[0]
+
+    # --- children ---
+    cur.execute("DELETE FROM gallery_images  WHERE game_id=?", (game_id,))
+    cur.execute("DELETE FROM alternate_names WHERE game_id=?", (game_id,))
+    for link_table, _ in ENTITY_LINKS.values():
+        cur.execute(f"DELETE FROM {link_table} WHERE game_id=?", (game_id,))
+
+    for u in split_pipe_list(get_field(r, "gallery_images")):
+        cur.execute("INSERT INTO gallery_images (game_id, url) VALUES (?,?)", (game_id, u))
+
+    alt_names = split_pipe_list(get_field(r, "alternate_names"))
+    for name in alt_names:
+        cur.execute("INSERT INTO alternate_names (game_id, name) VALUES (?,?)", (game_id, name))
+
+    for entity, (link_table, id_column) in ENTITY_LINKS.items():
+        for position, name in enumerate(split_pipe_list(get_field(r, entity))):
+            cur.execute(f"INSERT INTO {link_table} (game_id, position, {id_column}) VALUES (?,?,?)",
+                        (game_id, position, intern_entity(cur, entity, name)))
+
+    # --- full-text index (แทนที่แถวเดิมของเกมนี้) ---
+    cur.execute("DELETE FROM games_fts WHERE rowid=?", (game_id,))
+    cur.execute(
+        "INSERT INTO games_fts (rowid, title, alternate_names, description) VALUES (?,?,?,?)",
+        (game_id, title, "\n".join(alt_names), desc)
+    )
+    return game_id
+
+def import_details(csv_path: str, db_path: str, reset: bool = False):
+    # reset = เริ่มฐานข้อมูลใหม่ (ตารางหมวด/leaderboard หายไปด้วย ต้องรัน migrate_add_categories.py ใหม่)
+    # ไม่ reset = upsert ทับ DB เดิม หมวดและ leaderboard ที่มีอยู่ถูกอัปเดตเฉพาะเกมที่เปลี่ยน
+    if reset:
+        Path(db_path).unlink(missing_ok=True)
 
     con = sqlite3.connect(db_path)
     cur = con.cursor()
+    # DB รุ่นเก่า: designers/artists/publishers ยังเป็น 1 แถวต่อเกม ต้องแปลงก่อน (CREATE IF NOT EXISTS ข้ามตารางเดิม)
+    from migrate_intern_entities import intern_entities   # import ในฟังก์ชัน: โมดูลนั้น import จากไฟล์นี้
+    intern_entities(cur)
+    had_fts = cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'games_fts'").fetchone()
     cur.executescript(SCHEMA_SQL)
+    ensure_year_column(cur)
+    if not had_fts:
+        # DB ก่อนมี FTS: เติมทุกเกมที่มีอยู่ ไม่งั้น /search เจอแค่เกมที่ upsert รอบนี้
+        cur.execute("""
+            INSERT INTO games_fts (rowid, title, alternate_names, description)
+            SELECT g.id, g.title,
+                   COALESCE((SELECT group_concat(name, char(10))
+                             FROM (SELECT name FROM alternate_names WHERE game_id = g.id ORDER BY id)), ''),
+                   g.description
+            FROM games g
+        """)
 
     skipped = 0
     total = 0
     inserted = 0
+    upserted = set()
 
     with open(csv_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -166,61 +299,35 @@ def import_details(csv_path: str, db_path: str):
         for r in reader:
             total += 1
 
-            # --- fields (ใช้ alias-aware getter) ---
-            detail_url = get_field(r, "detail_url").strip()
-            if not detail_url:
+            if not get_field(r, "detail_url").strip():
                 skipped += 1
                 # เตือนแบบเบาๆ (คอมเมนต์ทิ้งได้)
                 print(f"skip row#{total}: missing detail_url (check header name, e.g. 'detail url' vs 'detail_url')")
                 continue
 
-            title = html.unescape(get_field(r, "title")).strip()
-            desc  = html.unescape(get_field(r, "description"))
-
-            players_min = to_int(get_field(r, "players_min"))
-            players_max = to_int(get_field(r, "players_max"))
-            time_min    = to_int(get_field(r, "time_min"))
-            time_max    = to_int(get_field(r, "time_max"))
-            age_plus    = to_int(get_field(r, "age_plus"))
-            weight_5    = to_float(get_field(r, "weight_5"))
-            avg_rating  = to_float(get_field(r, "average_rating"))
-
-            og_image      = get_field(r, "og_image").strip()
-            primary_image = get_field(r, "primary_image").strip()
-
-            cur.execute(
-                INSERT_GAME_SQL,
-                (detail_url, title, players_min, players_max, time_min, time_max,
-                 age_plus, weight_5, avg_rating, desc, og_image, primary_image)
-            )
-            game_id = cur.fetchone()[0]
+            upserted.add(upsert_game(cur, r))
             inserted += 1
 
-            # --- children ---
-            cur.execute("DELETE FROM gallery_images  WHERE game_id=?", (game_id,))
-            cur.execute("DELETE FROM alternate_names WHERE game_id=?", (game_id,))
-            cur.execute("DELETE FROM designers       WHERE game_id=?", (game_id,))
-            cur.execute("DELETE FROM artists         WHERE game_id=?", (game_id,))
-            cur.execute("DELETE FROM publishers      WHERE game_id=?", (game_id,))
-
-            for u in split_pipe_list(get_field(r, "gallery_images")):
-                cur.execute("INSERT INTO gallery_images (game_id, url) VALUES (?,?)", (game_id, u))
-
-            for name in split_pipe_list(get_field(r, "alternate_names")):
-                cur.execute("INSERT INTO alternate_names (game_id, name) VALUES (?,?)", (game_id, name))
-
-            for name in split_pipe_list(get_field(r, "designers")):
-                cur.execute("INSERT INTO designers (game_id, name) VALUES (?,?)", (game_id, name))
-
-            for name in split_pipe_list(get_field(r, "artists")):
-                cur.execute("INSERT INTO artists (game_id, name) VALUES (?,?)", (game_id, name))
-
-            for name in split_pipe_list(get_field(r, "publishers")):
-                cur.execute("INSERT INTO publishers (game_id, name) VALUES (?,?)", (game_id, name))
-
+    prune_entities(cur)
+    # ถ้า DB เดิมมีหมวดอยู่แล้ว (ไม่ได้รีเซ็ต) ให้สรุปสถิติหมวดใหม่ตามค่าที่เพิ่ง upsert
+    if cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'game_categories'").fetchone():
+        ensure_category_titles(cur)
+        refresh_category_titles(cur, upserted)
+        refresh_category_stats(cur)
+    # leaderboard อัปเดตเฉพาะเกมที่เพิ่ง upsert
+    if cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'category_leaderboard'").fetchone():
+        update_leaderboards(cur, upserted)
+
+    # สถิติให้ query planner เลือก index ที่แคบที่สุดของ /games/filter
+    cur.execute("ANALYZE")
     con.commit()
     con.close()
     print(f"✅ Imported/updated {inserted} rows into {db_path} (total={total}, skipped_missing_detail_url={skipped})")
 
 if __name__ == "__main__":
-    import_details(CSV_FILE, DB_FILE)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default=CSV_FILE)
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--reset", action="store_true", help="ลบ DB เดิมแล้ว import ใหม่ทั้งหมด")
+    args = ap.parse_args()
+    import_details(args.csv, args.db, args.reset)
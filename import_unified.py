@@ -0,0 +1,115 @@
+# import_unified.py
+# -*- coding: utf-8 -*-
+"""
+รวม CSV ดัชนีหมวด (import_bgg.py) + CSV รายละเอียด (import_bgg_details.py) เป็นฐานข้อมูลเดียว bgg.db
+- games.id = BGG id (แงะจาก url ด้วย ID_RE) ทุกตารางอ้างด้วย integer game_id
+- listings = แถวของดัชนีหมวด (แทน bgg_new.db) ผูกกับ games ด้วย game_id ไม่ต้องจับคู่ url ตอน query
+- เกมที่อยู่ในดัชนีแต่ยังไม่มีรายละเอียด สร้างแถว games ขั้นต่ำจากดัชนี (title, url, รูป)
+
+ถ้ามี bgg.db อยู่ในโฟลเดอร์ที่รัน API จะอ่านจากไฟล์นี้ไฟล์เดียวแทน bgg_new.db + bgg_details.db
+"""
+
+import csv
+import sqlite3
+from pathlib import Path
+
+import import_bgg
+import import_bgg_details
+from import_bgg_details import get_field, upsert_game
+from migrate_add_categories import (CATEGORIES_SCHEMA_SQL, ensure_category_titles, extract_id_from_url,
+                                    refresh_category_stats, refresh_category_titles, refresh_leaderboards)
+
+DB_FILE = "bgg.db"
+
+LISTINGS_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS listings (
+  id        INTEGER PRIMARY KEY AUTOINCREMENT,
+  game_id   INTEGER NOT NULL,
+  category  TEXT NOT NULL,
+  name      TEXT NOT NULL,
+  year      INTEGER,
+  image_url TEXT,
+  FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_listings_name     ON listings(name);
+CREATE INDEX IF NOT EXISTS idx_listings_category ON listings(category);
+CREATE INDEX IF NOT EXISTS idx_listings_game     ON listings(game_id);
+
+-- จำนวนแถว listings ต่อหมวด (total ของ /games)
+CREATE TABLE IF NOT EXISTS category_counts (
+  category TEXT PRIMARY KEY,
+  games    INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+def refresh_category_counts(cur):
+    cur.execute("DELETE FROM category_counts")
+    cur.execute("INSERT INTO category_counts SELECT category, COUNT(*) FROM listings GROUP BY category")
+
+def import_unified(index_csv: str, details_csv: str, db_path: str):
+    Path(db_path).unlink(missing_ok=True)
+
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+    cur.executescript(import_bgg_details.SCHEMA_SQL)
+    cur.executescript(CATEGORIES_SCHEMA_SQL)
+    ensure_category_titles(cur)
+    cur.executescript(LISTINGS_SCHEMA_SQL)
+
+    # --- รายละเอียด: BGG id เป็น primary key ---
+    urls = {}   # BGG id -> detail_url แถวแรก (url คนละแบบของเกมเดียวกันให้ upsert ทับแถวเดิม)
+    details = no_id = 0
+    if Path(details_csv).exists():
+        with open(details_csv, newline="", encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                bid = extract_id_from_url(get_field(r, "detail_url").strip())
+                if not bid:
+                    no_id += 1
+                    continue
+                gid = int(bid)
+                r = dict(r, detail_url=urls.setdefault(gid, get_field(r, "detail_url").strip()))
+                upsert_game(cur, r, gid)
+                details += 1
+    else:
+        print(f"details CSV not found: {details_csv} (games จะมีแค่ข้อมูลจากดัชนี)")
+
+    # --- ดัชนีหมวด -> listings + game_categories ---
+    listings = stubs = 0
+    with open(index_csv, newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            category = (r.get("category") or "").strip()
+            url      = (r.get("url") or "").strip()
+            bid = extract_id_from_url(url)
+            if not category or not bid:
+                no_id += 1
+                continue
+            gid = int(bid)
+            name = r["name"]
+            year = int(r["year"] or 0) or None
+            if gid not in urls:
+                urls[gid] = url
+                cur.execute("INSERT INTO games (id, detail_url, title, primary_image) VALUES (?,?,?,?)",
+                            (gid, url, name, r["image_url"]))
+                cur.execute("INSERT INTO games_fts (rowid, title, alternate_names, description) "
+                            "VALUES (?,?,'','')", (gid, name))
+                stubs += 1
+            cur.execute("INSERT INTO listings (game_id, category, name, year, image_url) VALUES (?,?,?,?,?)",
+                        (gid, category, name, year or 0, r["image_url"]))
+            if year:
+                cur.execute("UPDATE games SET year = ? WHERE id = ?", (year, gid))
+            cur.execute("INSERT OR IGNORE INTO game_categories (game_id, category) VALUES (?,?)",
+                        (gid, category))
+            listings += 1
+
+    refresh_category_counts(cur)
+    refresh_category_titles(cur)
+    refresh_category_stats(cur)
+    refresh_leaderboards(cur)
+    cur.execute("ANALYZE")
+    con.commit()
+    con.close()
+    print(f"✅ {db_path}: {details} detail rows, {listings} listings "
+          f"({stubs} games from index only, {no_id} rows without BGG id)")
+
+if __name__ == "__main__":
+    import_unified(import_bgg.CSV_FILE, import_bgg_details.CSV_FILE, DB_FILE)
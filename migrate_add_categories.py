@@ -1,5 +1,5 @@
 # migrate_add_categories.py
-import csv, re, sqlite3
+import csv, json, re, sqlite3
 from pathlib import Path
 
 DB_FILE   = "bgg_details.db"                       # DB รายละเอียดที่มีอยู่
@@ -12,6 +12,107 @@ def extract_id_from_url(u: str) -> str | None:
     m = ID_RE.search(u)
     return m.group(1) if m else None
 
+CATEGORIES_SCHEMA_SQL = """
+PRAGMA journal_mode=WAL;
+PRAGMA foreign_keys=ON;
+
+CREATE TABLE IF NOT EXISTS game_categories (
+  id        INTEGER PRIMARY KEY AUTOINCREMENT,
+  game_id   INTEGER NOT NULL,
+  category  TEXT    NOT NULL,
+  title     TEXT,   -- สำเนา games.title (refresh_category_titles) ให้ไล่หน้าในหมวดตามชื่อได้จาก index เดียว
+  FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE,
+  UNIQUE (game_id, category)
+);
+
+DROP INDEX IF EXISTS idx_gc_cat;
+CREATE INDEX IF NOT EXISTS idx_gc_cat_game ON game_categories(category, game_id);
+CREATE INDEX IF NOT EXISTS idx_gc_game  ON game_categories(game_id);
+"""
+
+CATEGORY_STATS_SQL = """
+CREATE TABLE IF NOT EXISTS category_stats (
+  category    TEXT PRIMARY KEY,
+  games       INTEGER NOT NULL,
+  avg_rating  REAL,
+  avg_weight  REAL
+) WITHOUT ROWID;
+"""
+
+def ensure_category_titles(cur):
+    """DB รุ่นก่อนยังไม่มี game_categories.title (สร้าง index หลังมีคอลัมน์แล้วเท่านั้น)"""
+    columns = {r[1] for r in cur.execute("PRAGMA table_info(game_categories)")}
+    if "title" not in columns:
+        cur.execute("ALTER TABLE game_categories ADD COLUMN title TEXT")
+        refresh_category_titles(cur)
+    # หน้าในหมวดเรียงตามชื่อ: seek (category, title, game_id) อ่านแค่ limit แถว ไม่ว่าหมวดเล็กหรือใหญ่
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gc_cat_title ON game_categories(category, title, game_id)")
+
+def refresh_category_titles(cur, game_ids=None):
+    """คัดลอก games.title ลง game_categories ทุกแถว หรือเฉพาะเกมใน game_ids (หลัง upsert)"""
+    where, params = "", ()
+    if game_ids is not None:
+        where, params = "WHERE game_id IN (SELECT value FROM json_each(?))", (json.dumps(list(game_ids)),)
+    cur.execute(f"""
+        UPDATE game_categories SET title = (SELECT g.title FROM games g WHERE g.id = game_categories.game_id)
+        {where}
+    """, params)
+
+def refresh_category_stats(cur):
+    """สร้างตารางสรุปต่อหมวดใหม่ทั้งหมด (จำนวนเกม, rating/weight เฉลี่ย)"""
+    cur.executescript(CATEGORY_STATS_SQL)
+    cur.execute("DELETE FROM category_stats")
+    cur.execute("""
+        INSERT INTO category_stats (category, games, avg_rating, avg_weight)
+        SELECT gc.category, COUNT(*), AVG(g.average_rating), AVG(g.weight_5)
+        FROM game_categories gc
+        JOIN games g ON g.id = gc.game_id
+        GROUP BY gc.category
+    """)
+
+# อันดับต่อหมวดต่อ metric (มาก -> น้อย) เก็บทุกเกมในหมวด เรียงตาม primary key
+# top-k = range scan ตาม prefix (category, metric) อ่านแค่ k แถว
+LEADERBOARD_METRICS = ("average_rating", "weight_5", "year")
+
+LEADERBOARD_SQL = """
+CREATE TABLE IF NOT EXISTS category_leaderboard (
+  category  TEXT    NOT NULL,
+  metric    TEXT    NOT NULL,
+  value     REAL    NOT NULL,
+  game_id   INTEGER NOT NULL,
+  PRIMARY KEY (category, metric, value DESC, game_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_leaderboard_game ON category_leaderboard(game_id);
+"""
+
+def _insert_leaderboard_rows(cur, where: str = "", params: tuple = ()):
+    for metric in LEADERBOARD_METRICS:
+        cur.execute(f"""
+            INSERT INTO category_leaderboard (category, metric, value, game_id)
+            SELECT gc.category, '{metric}', g.{metric}, g.id
+            FROM game_categories gc
+            JOIN games g ON g.id = gc.game_id
+            WHERE g.{metric} IS NOT NULL {where}
+        """, params)
+
+def refresh_leaderboards(cur):
+    """สร้าง leaderboard ทุกหมวดใหม่ทั้งหมด"""
+    cur.executescript(LEADERBOARD_SQL)
+    cur.execute("DELETE FROM category_leaderboard")
+    _insert_leaderboard_rows(cur)
+
+def update_leaderboards(cur, game_ids):
+    """อัปเดตเฉพาะแถวของเกมที่เปลี่ยน (ลบของเดิมแล้วใส่ค่าใหม่) ไม่แตะเกมอื่นในหมวด"""
+    ids = json.dumps(list(game_ids))
+    cur.execute("DELETE FROM category_leaderboard WHERE game_id IN (SELECT value FROM json_each(?))", (ids,))
+    _insert_leaderboard_rows(cur, "AND gc.game_id IN (SELECT value FROM json_each(?))", (ids,))
+
+def ensure_year_column(cur):
+    """DB รายละเอียดรุ่นเก่ายังไม่มีคอลัมน์ year (ปีมาจาก CSV ดัชนีหมวด)"""
+    columns = {r[1] for r in cur.execute("PRAGMA table_info(games)")}
+    if "year" not in columns:
+        cur.execute("ALTER TABLE games ADD COLUMN year INTEGER")
+
 def main():
     if not Path(DB_FILE).exists():
         raise SystemExit(f"DB not found: {DB_FILE}")
@@ -19,21 +120,9 @@ def main():
     con = sqlite3.connect(DB_FILE)
     cur = con.cursor()
 
-    cur.executescript("""
-    PRAGMA journal_mode=WAL;
-    PRAGMA foreign_keys=ON;
-
-    CREATE TABLE IF NOT EXISTS game_categories (
-      id        INTEGER PRIMARY KEY AUTOINCREMENT,
-      game_id   INTEGER NOT NULL,
-      category  TEXT    NOT NULL,
-      FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE,
-      UNIQUE (game_id, category)
-    );
-
-    CREATE INDEX IF NOT EXISTS idx_gc_cat   ON game_categories(category);
-    CREATE INDEX IF NOT EXISTS idx_gc_game  ON game_categories(game_id);
-    """)
+    cur.executescript(CATEGORIES_SCHEMA_SQL)
+    ensure_year_column(cur)
+    ensure_category_titles(cur)
 
     # เตรียม map จาก games.detail_url และ/หรือ bgg id -> games.id
     cur.execute("SELECT id, detail_url FROM games")
@@ -68,6 +157,10 @@ def main():
                 nomatch += 1
                 continue
 
+            year = (row.get("year") or "").strip()
+            if year.isdigit() and int(year):
+                cur.execute("UPDATE games SET year = ? WHERE id = ?", (int(year), gid))
+
             try:
                 cur.execute("INSERT OR IGNORE INTO game_categories (game_id, category) VALUES (?,?)",
                             (gid, category))
@@ -76,6 +169,10 @@ def main():
             except Exception as e:
                 print("insert error:", e)
 
+    refresh_category_titles(cur)
+    refresh_category_stats(cur)
+    refresh_leaderboards(cur)
+    cur.execute("ANALYZE game_categories")
     con.commit()
     con.close()
     print(f"✅ categories linked: +{inserted} rows (unmatched from CSV: {nomatch})")
@@ -0,0 +1,69 @@
+# migrate_intern_entities.py
+# -*- coding: utf-8 -*-
+"""
+แปลง designers / artists / publishers ของ DB รุ่นเก่า (1 แถว = เกม + ชื่อ) เป็น entity + ตาราง link
+ตาม schema ปัจจุบันของ import_bgg_details.py โดยไม่ต้อง import CSV ใหม่ แล้ว VACUUM ให้ไฟล์เล็กลง
+
+    python migrate_intern_entities.py [bgg_details.db | bgg.db]
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+from import_bgg_details import DB_FILE, ENTITY_LINKS, ENTITY_SCHEMA_SQL
+
+def is_legacy(cur, entity: str) -> bool:
+    return "game_id" in {r[1] for r in cur.execute(f"PRAGMA table_info({entity})")}
+
+def intern_entities(cur) -> list[str]:
+    """แปลงตาราง entity รุ่นเก่าที่เจอเป็น entity + link คืนชื่อ entity ที่แปลง (ว่าง = เป็นรูปแบบใหม่แล้ว)"""
+    legacy = [e for e in ENTITY_LINKS if is_legacy(cur, e)]
+    if not legacy:
+        return legacy
+
+    for entity in legacy:
+        cur.execute(f"ALTER TABLE {entity} RENAME TO {entity}_old")
+    # สร้างเฉพาะตาราง entity / link (SCHEMA_SQL เต็มจะสร้าง games_fts เปล่าทับ DB ที่ยังไม่มี FTS -> /search ว่าง)
+    cur.executescript(ENTITY_SCHEMA_SQL)
+
+    for entity in legacy:
+        link_table, id_column = ENTITY_LINKS[entity]
+        # id ตามลำดับที่ชื่อปรากฏครั้งแรก, position ตามลำดับแถวเดิมในแต่ละเกม
+        cur.execute(f"""
+            INSERT INTO {entity} (name)
+            SELECT name FROM {entity}_old GROUP BY name ORDER BY MIN(id)
+        """)
+        cur.execute(f"""
+            INSERT INTO {link_table} (game_id, position, {id_column})
+            SELECT o.game_id, ROW_NUMBER() OVER (PARTITION BY o.game_id ORDER BY o.id) - 1, e.id
+            FROM {entity}_old o
+            JOIN {entity} e ON e.name = o.name
+        """)
+        cur.execute(f"DROP TABLE {entity}_old")
+        names = cur.execute(f"SELECT COUNT(*) FROM {entity}").fetchone()[0]
+        links = cur.execute(f"SELECT COUNT(*) FROM {link_table}").fetchone()[0]
+        print(f"  {entity}: {links:,d} rows -> {names:,d} names")
+    return legacy
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DB_FILE
+    if not Path(db_path).exists():
+        raise SystemExit(f"DB not found: {db_path}")
+
+    before = Path(db_path).stat().st_size
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+    if not intern_entities(cur):
+        print(f"{db_path}: entities already interned")
+        return
+
+    cur.execute("ANALYZE")
+    con.commit()
+    cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    cur.execute("VACUUM")
+    con.close()
+    print(f"✅ {db_path}: {before:,d} -> {Path(db_path).stat().st_size:,d} bytes")
+
+if __name__ == "__main__":
+    main()